@@ -0,0 +1,211 @@
+"""Database micro-benchmarks at realistic table sizes.
+
+Builds an anon_chat.db with the configured volumes once, then for every
+pragma set copies it, opens it with database.Database and times each
+public method. Results (per method: calls, mean/p50/p99 in microseconds)
+go to JSON so runs can be compared between versions.
+
+    python bench/bench_database.py --users 1000000 --posts 50000 --chats 20000 --json db.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database import Database  # noqa: E402
+
+USER0 = 5_000_000_000
+DAY = 24 * 3600
+
+# Наборы PRAGMA для сравнения; write_behind_rows - пачки коммитов Database
+CONFIGS: Dict[str, Dict[str, Any]] = {
+    'delete_full': {'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'}},
+    'wal_full': {'pragmas': {'journal_mode': 'WAL', 'synchronous': 'FULL'}},
+    'wal_normal': {'pragmas': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}},
+    'wal_normal_mmap': {'pragmas': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'mmap_size': 256 * 1024 * 1024,
+                                    'cache_size': -65536, 'temp_store': 'MEMORY'}},
+    'wal_normal_batched': {'pragmas': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}, 'write_behind_rows': 64},
+}
+
+
+def populate(path: str, args) -> Dict[str, float]:
+    started = time.perf_counter()
+    Database(path=path).conn.close()  # схема и миграции
+    rnd = random.Random(args.seed)
+    now = int(time.time())
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executemany('INSERT INTO users (user_id, username, full_name) VALUES (?, ?, ?)',
+                     ((USER0 + i, f'user{i}', f'User {i}') for i in range(args.users)))
+    # Половина постов свежая (до 5 часов), остальные старше суток - работа для delete_old_posts
+    authors = rnd.sample(range(args.users), args.posts)
+    conn.executemany('INSERT INTO posts (user_id, text, created_at) VALUES (?, ?, ?)', (
+        (USER0 + a, f'Пост {a}: ' + 'текст ' * 20,
+         now - rnd.randrange(5 * 3600) if i % 2 else now - DAY - rnd.randrange(DAY))
+        for i, a in enumerate(authors)))
+    members = rnd.sample(range(args.users), args.chats * 2)
+    conn.executemany('INSERT INTO chats (user1_id, user2_id, created_at) VALUES (?, ?, ?)', (
+        (USER0 + members[2 * i], USER0 + members[2 * i + 1],
+         time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now - rnd.randrange(3 * DAY))))
+        for i in range(args.chats)))
+    conn.executemany('INSERT INTO message_mirror VALUES (?, ?, ?, ?, ?)', (
+        (USER0 + members[(i % args.chats) * 2], USER0 + members[(i % args.chats) * 2 + 1], i, i + 1,
+         now - rnd.randrange(3 * DAY))
+        for i in range(args.mirror)))
+    conn.executemany('INSERT INTO subscriptions (user_id, expires_at, permanent) VALUES (?, ?, ?)', (
+        (USER0 + u, now + rnd.randrange(-30 * DAY, 30 * DAY), int(rnd.random() < 0.1))
+        for u in rnd.sample(range(args.users), args.subscriptions)))
+    conn.executemany('INSERT OR IGNORE INTO interactions VALUES (?, ?, ?)', (
+        (USER0 + min(a, b), USER0 + max(a, b), now + rnd.randrange(-3 * 3600, 3 * 3600))
+        for a, b in ((rnd.randrange(args.users), rnd.randrange(args.users)) for _ in range(args.interactions))))
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+    return {'seconds': round(time.perf_counter() - started, 2), 'bytes': os.path.getsize(path)}
+
+
+def timed(func: Callable[[], Any], reps: int) -> Dict[str, float]:
+    samples: List[float] = []
+    gc.disable()
+    try:
+        for _ in range(reps):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    samples.sort()
+    return {
+        'calls': reps,
+        'mean_us': round(sum(samples) / reps * 1e6, 2),
+        'p50_us': round(samples[reps // 2] * 1e6, 2),
+        'p99_us': round(samples[min(reps - 1, int(reps * 0.99))] * 1e6, 2),
+    }
+
+
+def bench_config(path: str, config: Dict[str, Any], args) -> Dict[str, Dict[str, float]]:
+    db = Database(write_behind_rows=config.get('write_behind_rows', 1), path=path)
+    for name, value in config['pragmas'].items():
+        db.conn.execute(f'PRAGMA {name}={value}')
+    rnd = random.Random(args.seed)
+    users = [USER0 + i for i in range(args.users)]
+    posted = [row[0] for row in db.conn.execute('SELECT user_id FROM posts LIMIT 5000')]
+    chatting = [row[0] for row in db.conn.execute('SELECT user1_id FROM chats LIMIT 5000')]
+    fresh = iter(range(USER0 + args.users, USER0 + args.users + 10 ** 7))
+    mirror_ids = iter(range(args.mirror, args.mirror + 10 ** 7))
+    now = int(time.time())
+    reps, slow = args.reps, args.slow_reps
+
+    def end_and_recreate():
+        user1 = rnd.choice(chatting)
+        user2 = db.get_active_chat_partner(user1)
+        db.end_chat(user1)
+        if user2 is not None:
+            db.create_chat(user1, user2)
+
+    # Сначала чтения, потом записи, разрушающие операции в конце
+    cases = [
+        ('warm_caches', db.warm_caches, slow),
+        ('reconcile_stats', db.reconcile_stats, slow),
+        ('check_partner_consistency', lambda: db.check_partner_consistency(repair=False), slow),
+        ('get_all_users', db.get_all_users, slow),
+        ('get_posts_raw', db.get_posts_raw, slow),
+        ('get_active_posts', db.get_active_posts, slow),
+        ('count_users', db.count_users, reps // 10 or 1),
+        ('count_active_chats', db.count_active_chats, reps // 10 or 1),
+        ('count_posts_since', lambda: db.count_posts_since(DAY), reps),
+        ('get_interactions', db.get_interactions, slow),
+        ('get_post', lambda: db.get_post(rnd.choice(posted)), reps),
+        ('get_active_chat_partner', lambda: db.get_active_chat_partner(rnd.choice(chatting)), reps),
+        ('get_active_chat_partner_db', lambda: db.get_active_chat_partner_db(rnd.choice(users)), reps),
+        ('has_active_subscription', lambda: db.has_active_subscription(rnd.choice(users)), reps),
+        ('get_mirrored_message_id',
+         lambda: db.get_mirrored_message_id(rnd.choice(chatting), rnd.randrange(args.mirror or 1)), reps),
+        ('get_user_ids_after', lambda: db.get_user_ids_after(rnd.choice(users), 500), reps // 10 or 1),
+        ('add_user', lambda: db.add_user(next(fresh), 'u', 'User'), reps),
+        ('add_post', lambda: db.add_post(rnd.choice(users), 'Пост ' + 'текст ' * 20), reps),
+        ('save_message_mirror',
+         lambda: db.save_message_mirror(rnd.choice(users), rnd.choice(users), next(mirror_ids), 1), reps),
+        ('set_subscription', lambda: db.set_subscription(rnd.choice(users), months=1), reps),
+        ('save_interaction', lambda: db.save_interaction(rnd.choice(users), rnd.choice(users), now + 3600), reps),
+        ('save_drafts', lambda: db.save_drafts([(rnd.choice(users), 'черновик', now)]), reps),
+        ('pop_draft', lambda: db.pop_draft(rnd.choice(users), DAY), reps),
+        ('end_chat+create_chat', end_and_recreate, reps),
+        ('delete_post', lambda: db.delete_post(rnd.choice(posted)), reps),
+        ('delete_expired_interactions', db.delete_expired_interactions, 1),
+        ('delete_mirror_batch', lambda: db.delete_mirror_batch(now - DAY, 500), slow),
+        ('delete_old_posts', lambda: db.delete_old_posts(DAY), 1),
+    ]
+    results = {}
+    for name, func, count in cases:
+        if args.only and name not in args.only:
+            continue
+        results[name] = timed(func, count)
+        db.flush()
+    db.flush()
+    db.conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--chats', type=int, default=2000)
+    parser.add_argument('--mirror', type=int, default=100000, help='message_mirror rows')
+    parser.add_argument('--subscriptions', type=int, default=5000)
+    parser.add_argument('--interactions', type=int, default=20000)
+    parser.add_argument('--reps', type=int, default=2000, help='calls per fast method')
+    parser.add_argument('--slow-reps', type=int, default=5, help='calls per full-scan method')
+    parser.add_argument('--configs', default=','.join(CONFIGS), help=f'comma-separated, from: {", ".join(CONFIGS)}')
+    parser.add_argument('--only', nargs='*', help='benchmark only these methods')
+    parser.add_argument('--dir', help='work dir for the generated databases (default: temp dir)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # логи миграций
+
+    workdir = args.dir or tempfile.mkdtemp(prefix='tganon-dbbench-')
+    os.makedirs(workdir, exist_ok=True)
+    base = os.path.join(workdir, 'anon_chat.db')
+    if os.path.exists(base):
+        os.remove(base)
+    setup = populate(base, args)
+    print(f"populated {base}: {setup['bytes'] / 2 ** 20:.1f} MiB in {setup['seconds']} s")
+
+    results = {}
+    try:
+        for name in args.configs.split(','):
+            path = os.path.join(workdir, f'{name}.db')
+            shutil.copyfile(base, path)
+            results[name] = bench_config(path, CONFIGS[name], args)
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+    finally:
+        if not args.dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    configs = list(results)
+    methods = list(results[configs[0]]) if configs else []
+    print(f"{'method (p50 us)':<30}" + ''.join(f'{c:>20}' for c in configs))
+    for method in methods:
+        print(f'{method:<30}' + ''.join(f"{results[c][method]['p50_us']:>20}" for c in configs))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'setup': setup, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
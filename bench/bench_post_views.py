@@ -0,0 +1,117 @@
+"""Post view cooldowns: old dict-of-dicts vs stores.PostViewStore.
+
+    python bench/bench_post_views.py --viewers 50000 --views 20
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from stores import PostViewStore  # noqa: E402
+
+COOLDOWN = 600
+
+
+class DictOfDicts:
+    """The structure main.py used before: {viewer: {owner: float_ts}}."""
+
+    def __init__(self):
+        self.data = {}
+
+    def record(self, viewer_id, owner_id, now):
+        if viewer_id not in self.data:
+            self.data[viewer_id] = {}
+        self.data[viewer_id][owner_id] = now
+
+    def can_show(self, viewer_id, owner_id, now):
+        if viewer_id not in self.data or owner_id not in self.data[viewer_id]:
+            return True
+        return now - self.data[viewer_id][owner_id] >= COOLDOWN
+
+    def expire(self, now):
+        # Полный обход, как clean_old_user_views
+        for viewer in list(self.data.keys()):
+            for owner in list(self.data[viewer].keys()):
+                if now - self.data[viewer][owner] > COOLDOWN:
+                    del self.data[viewer][owner]
+            if not self.data.get(viewer):
+                self.data.pop(viewer, None)
+
+
+V0 = 6_000_000_000  # реалистичные id Telegram, больше 2^32
+T0 = 1_700_000_000.0
+
+
+def workload(viewers, views, owners, seed):
+    # Только индексы: id и время создаются заново при каждой записи, как в боте
+    rnd = random.Random(seed)
+    return [(rnd.randrange(viewers), rnd.randrange(owners)) for _ in range(viewers * views)]
+
+
+def run(name, make, events, probes, step):
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    store = make()
+    started = time.perf_counter()
+    for i, (viewer, owner) in enumerate(events):
+        store.record(V0 + viewer, V0 + owner, T0 + i * step)
+    record_s = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    now = T0 + len(events) * step
+    started = time.perf_counter()
+    for viewer_id, owner_id in probes:
+        store.can_show(viewer_id, owner_id, now)
+    check_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    store.expire(now + COOLDOWN + 60)
+    expire_s = time.perf_counter() - started
+    return {
+        'name': name,
+        'entries': len(events),
+        'bytes_per_entry': round(memory / len(events), 1),
+        'record_us': round(record_s / len(events) * 1e6, 3),
+        'check_us': round(check_s / len(probes) * 1e6, 3),
+        'expire_ms': round(expire_s * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--viewers', type=int, default=20000)
+    parser.add_argument('--views', type=int, default=20, help='views per viewer inside one cooldown window')
+    parser.add_argument('--owners', type=int, default=5000)
+    parser.add_argument('--probes', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    events = workload(args.viewers, args.views, args.owners, args.seed)
+    step = COOLDOWN / len(events)  # все просмотры внутри одного окна cooldown
+    rnd = random.Random(args.seed + 1)
+    probes = [(V0 + events[rnd.randrange(len(events))][0], V0 + rnd.randrange(args.owners))
+              for _ in range(args.probes)]
+
+    results = [
+        run('dict_of_dicts', DictOfDicts, events, probes, step),
+        run('PostViewStore', lambda: PostViewStore(cooldown=COOLDOWN), events, probes, step),
+    ]
+    for r in results:
+        print(f"{r['name']:>14}: {r['bytes_per_entry']:>7} B/entry  record {r['record_us']} us  "
+              f"check {r['check_us']} us  expire {r['expire_ms']} ms")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""Local stand-in for the Telegram Bot API, for load tests.
+
+Serves /bot<token>/<method>: feeds pushed updates through getUpdates,
+records sendMessage, sendPhoto and other outgoing calls and answers them
+with plausible objects. Start the bot with BOT_API_URL pointing here.
+
+    python bench/fake_bot_api.py --port 8081
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from aiohttp import web
+
+BOT_ID = 123456
+BOT_USER = {'id': BOT_ID, 'is_bot': True, 'first_name': 'LoadTestBot', 'username': 'load_test_bot'}
+
+SEND_METHODS = {
+    'sendmessage': 'text',
+    'sendphoto': 'photo',
+    'sendvideo': 'video',
+    'sendaudio': 'audio',
+    'sendvoice': 'voice',
+    'sendvideonote': 'video_note',
+    'senddocument': 'document',
+    'sendsticker': 'sticker',
+}
+
+
+def user(user_id: int) -> Dict[str, Any]:
+    return {'id': user_id, 'is_bot': False, 'first_name': f'user{user_id}', 'username': f'user{user_id}'}
+
+
+def _decode(value: Any) -> Any:
+    # aiogram шлёт form-data: вложенные объекты - JSON-строками
+    if isinstance(value, str) and value[:1] in '{[':
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+class FakeBotAPI:
+    """Bot API stand-in: update feed, recorded calls, per-chat inboxes."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._callback_ids = itertools.count(1)
+        self._updates: Deque[Dict[str, Any]] = deque()
+        self._updates_ready = asyncio.Event()
+        self._callback_users: Dict[str, int] = {}
+        # Всё, что бот отправил в чат (сообщения и ответы на callback), по порядку
+        self._inbox: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        self._inbox_changed: Dict[int, asyncio.Event] = defaultdict(asyncio.Event)
+        self._runner: Optional[web.AppRunner] = None
+
+    # ---------- Updates ----------
+    def push(self, update: Dict[str, Any]) -> int:
+        update['update_id'] = next(self._update_ids)
+        self._updates.append(update)
+        self._updates_ready.set()
+        return update['update_id']
+
+    def push_message(self, user_id: int, text: str) -> int:
+        message = {
+            'message_id': next(self._message_ids),
+            'from': user(user_id),
+            'chat': {'id': user_id, 'type': 'private', 'first_name': f'user{user_id}'},
+            'date': int(time.time()),
+            'text': text,
+        }
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        return self.push({'message': message})
+
+    def push_callback(self, user_id: int, data: str, message: Optional[Dict[str, Any]] = None) -> int:
+        callback_id = str(next(self._callback_ids))
+        self._callback_users[callback_id] = user_id
+        message = message or {
+            'message_id': next(self._message_ids),
+            'chat': {'id': user_id, 'type': 'private'},
+            'date': int(time.time()),
+            'text': '',
+        }
+        return self.push({'callback_query': {
+            'id': callback_id,
+            'from': user(user_id),
+            'message': message,
+            'chat_instance': str(user_id),
+            'data': data,
+        }})
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        timeout = float(params.get('timeout') or 0)
+        while self._updates and self._updates[0]['update_id'] < offset:
+            self._updates.popleft()  # подтверждены смещением
+        if not self._updates and timeout:
+            self._updates_ready.clear()
+            try:
+                await asyncio.wait_for(self._updates_ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(itertools.islice(self._updates, limit))
+
+    # ---------- Outgoing ----------
+    def _deliver(self, chat_id: int, entry: Dict[str, Any]):
+        entry['ts'] = time.perf_counter()
+        self._inbox[chat_id].append(entry)
+        self._inbox_changed[chat_id].set()
+
+    async def wait_for(self, chat_id: int, predicate: Callable[[Dict[str, Any]], bool],
+                       timeout: float = 30.0) -> Optional[Dict[str, Any]]:
+        """Pop the first entry in `chat_id`'s inbox matching `predicate`, waiting for it."""
+        deadline = time.perf_counter() + timeout
+        while True:
+            inbox = self._inbox[chat_id]
+            for index, entry in enumerate(inbox):
+                if predicate(entry):
+                    del inbox[index]
+                    return entry
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            event = self._inbox_changed[chat_id]
+            event.clear()
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    def discard(self, chat_id: int):
+        self._inbox.pop(chat_id, None)
+
+    def _message(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(params['chat_id'])
+        kind = SEND_METHODS.get(method, 'text')
+        message = {
+            'message_id': next(self._message_ids),
+            'from': BOT_USER,
+            'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'group'},
+            'date': int(time.time()),
+        }
+        if kind == 'text':
+            message['text'] = params.get('text', '')
+        else:
+            message['caption'] = params.get('caption')
+        markup = params.get('reply_markup')
+        if isinstance(markup, dict) and 'inline_keyboard' in markup:
+            # В объекте Message бывает только inline-клавиатура
+            message['reply_markup'] = markup
+        self._deliver(chat_id, {'method': method, 'kind': kind, 'message': message})
+        return message
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method'].lower()
+        if request.content_type == 'application/json':
+            raw = await request.json()
+        else:
+            raw = dict(await request.post())
+        params = {key: _decode(value) for key, value in raw.items()}
+        self.calls[method] += 1
+        if self.latency and method != 'getupdates':
+            await asyncio.sleep(self.latency)
+
+        if method == 'getupdates':
+            result: Any = await self._get_updates(params)
+        elif method == 'getme':
+            result = BOT_USER
+        elif method in SEND_METHODS:
+            result = self._message(method, params)
+        elif method == 'sendmediagroup':
+            result = [self._message('sendmessage', dict(params, text=''))]
+        elif method == 'copymessage':
+            result = {'message_id': self._message('sendmessage', params)['message_id']}
+        elif method == 'editmessagetext':
+            result = self._message('sendmessage', params)
+        elif method == 'answercallbackquery':
+            user_id = self._callback_users.pop(str(params.get('callback_query_id')), None)
+            if user_id is not None:
+                self._deliver(user_id, {'method': method, 'kind': 'callback_answer',
+                                        'text': params.get('text'), 'show_alert': bool(params.get('show_alert'))})
+            result = True
+        else:
+            result = True  # deleteMessage, setWebhook, deleteWebhook и прочее
+        return web.json_response({'ok': True, 'result': result})
+
+    # ---------- Server ----------
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        app.router.add_get('/bot{token}/{method}', self.handle)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8081):
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def _serve(host: str, port: int, latency: float):
+    api = FakeBotAPI(latency=latency)
+    await api.start(host, port)
+    print(f"Fake Bot API on http://{host}:{port} (BOT_API_URL=http://{host}:{port})")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(dict(api.calls))
+    finally:
+        await api.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=float, default=0, help='simulated Bot API round trip')
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.host, args.port, args.latency_ms / 1000))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
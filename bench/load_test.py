@@ -0,0 +1,323 @@
+"""Load test: the real bot (main.py) against the fake Bot API.
+
+Simulates N users: /start, authors post drafts through default_handler and
+publish them, seekers press "Смотреть посты 🔍" and pair through new_chat.
+callbacks, pairs chat through forward_message, then stop. Reports
+updates/sec, reply latency seen by users, handler p50/p99 and DB time from
+the bot's /metrics, and the bot's RSS.
+
+    python bench/load_test.py --users 2000 --messages 10 --json baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bot_api import BOT_ID, FakeBotAPI  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+USER0 = 7_000_000_000
+SEARCH = "Смотреть посты 🔍"
+
+
+def has_button(prefix: str):
+    def predicate(entry: Dict[str, Any]) -> bool:
+        markup = entry.get('message', {}).get('reply_markup') or {}
+        return any(button.get('callback_data', '').startswith(prefix)
+                   for row in markup.get('inline_keyboard', []) for button in row)
+    return predicate
+
+
+def text_contains(fragment: str):
+    return lambda entry: fragment in (entry.get('message', {}).get('text') or entry.get('text') or '')
+
+
+def button_data(entry: Dict[str, Any], prefix: str) -> str:
+    for row in entry['message']['reply_markup']['inline_keyboard']:
+        for button in row:
+            if button.get('callback_data', '').startswith(prefix):
+                return button['callback_data']
+    raise KeyError(prefix)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Scenario:
+    def __init__(self, api: FakeBotAPI, users: int, messages: int, concurrency: int, timeout: float, seed: int):
+        self.api = api
+        self.users = [USER0 + i for i in range(users)]
+        self.messages = messages
+        self.timeout = timeout
+        self.rnd = random.Random(seed)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.updates = 0
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.failures: Dict[str, int] = defaultdict(int)
+
+    async def step(self, name: str, push, chat_id: int, predicate) -> Optional[Dict[str, Any]]:
+        """Push one update and wait for the bot's reply in `chat_id`."""
+        started = time.perf_counter()
+        push()
+        self.updates += 1
+        entry = await self.api.wait_for(chat_id, predicate, self.timeout)
+        if entry is None:
+            self.failures[name] += 1
+            return None
+        self.latency[name].append(entry['ts'] - started)
+        return entry
+
+    async def bounded(self, coroutine):
+        async with self.semaphore:
+            return await coroutine
+
+    async def onboard(self, user_id: int):
+        await self.step('start', lambda: self.api.push_message(user_id, '/start'), user_id, text_contains('Привет'))
+
+    async def publish(self, user_id: int):
+        draft = await self.step('draft', lambda: self.api.push_message(user_id, f'Пост {user_id}: ищу собеседника'),
+                                user_id, has_button('post_'))
+        if draft:
+            data = button_data(draft, 'post_')
+            await self.step('publish', lambda: self.api.push_callback(user_id, data, draft['message']),
+                            user_id, text_contains('опубликован'))
+
+    async def pair(self, seeker: int) -> Optional[int]:
+        for _ in range(3):
+            post = await self.step('search', lambda: self.api.push_message(seeker, SEARCH), seeker, has_button('new_chat.'))
+            if not post:
+                return None
+            data = button_data(post, 'new_chat.')
+            joined = await self.step('new_chat', lambda: self.api.push_callback(seeker, data, post['message']), seeker,
+                                     lambda e: 'присоединились' in (e.get('message', {}).get('text') or '')
+                                     or e.get('kind') == 'callback_answer' and e.get('show_alert'))
+            if joined and joined.get('kind') != 'callback_answer':
+                return int(data.split('.')[1])
+        return None
+
+    async def chat(self, seeker: int, author: int):
+        self.api.discard(author)
+        for i in range(self.messages):
+            sender, receiver = (seeker, author) if i % 2 == 0 else (author, seeker)
+            text = f'm{i} {sender}'
+            await self.step('relay', lambda: self.api.push_message(sender, text), receiver, text_contains(text))
+        confirm = await self.step('stop', lambda: self.api.push_message(seeker, '/stop'), seeker, has_button('stop'))
+        if confirm:
+            await self.step('stop_confirm', lambda: self.api.push_callback(seeker, 'stop', confirm['message']),
+                            seeker, text_contains('Диалог завершен'))
+
+    async def seek_and_chat(self, seeker: int):
+        author = await self.pair(seeker)
+        if author is not None:
+            await self.chat(seeker, author)
+
+    async def run(self) -> Dict[str, float]:
+        phases = {}
+        half = len(self.users) // 2
+        authors, seekers = self.users[:half], self.users[half:]
+        for name, coroutines in (
+            ('onboard', [self.onboard(u) for u in self.users]),
+            ('publish', [self.publish(u) for u in authors]),
+            ('chat', [self.seek_and_chat(u) for u in seekers]),
+        ):
+            started = time.perf_counter()
+            await asyncio.gather(*(self.bounded(c) for c in coroutines))
+            phases[name] = round(time.perf_counter() - started, 3)
+        return phases
+
+
+# ---------- Bot process ----------
+def start_bot(workdir: str, api_url: str, metrics_port: int, real_limits: bool) -> subprocess.Popen:
+    # config.py не в репозитории - кладём токен для заглушки во временный каталог
+    with open(os.path.join(workdir, 'config.py'), 'w') as f:
+        f.write(f"BOT_TOKEN = '{BOT_ID}:LOADTEST'\n")
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': os.pathsep.join([workdir, os.path.abspath(ROOT)]),
+        'BOT_API_URL': api_url,
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'anon_chat.db')}",
+        'METRICS_PORT': str(metrics_port),
+        'ADMIN_LOG_CHAT': '',
+        'TRACE_FILE': os.path.join(workdir, 'slow_updates.jsonl'),
+    })
+    if not real_limits:
+        # Меряем сам бот, а не лимиты Telegram
+        env.setdefault('OUTBOUND_GLOBAL_RATE', '1000000')
+        env.setdefault('OUTBOUND_CHAT_RATE', '1000000')
+    log = open(os.path.join(workdir, 'bot.log'), 'w')
+    return subprocess.Popen([sys.executable, os.path.join(os.path.abspath(ROOT), 'main.py')],
+                            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+async def sample_rss(pid: int, samples: List[float]):
+    while True:
+        value = rss_mb(pid)
+        if value is not None:
+            samples.append(value)
+        await asyncio.sleep(0.5)
+
+
+async def scrape(metrics_port: int) -> str:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f'http://127.0.0.1:{metrics_port}/metrics') as response:
+            return await response.text()
+
+
+async def wait_ready(api: FakeBotAPI, process: subprocess.Popen, timeout: float = 30):
+    # Бот готов, когда начал опрашивать getUpdates
+    deadline = time.perf_counter() + timeout
+    while not api.calls['getupdates']:
+        if process.poll() is not None or time.perf_counter() > deadline:
+            raise RuntimeError('bot did not start, see bot.log')
+        await asyncio.sleep(0.1)
+
+
+# ---------- Prometheus text ----------
+LINE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+
+def parse_metrics(text: str) -> Dict[str, List[tuple]]:
+    series: Dict[str, List[tuple]] = defaultdict(list)
+    for line in text.splitlines():
+        match = LINE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            series[name].append((dict(re.findall(r'(\w+)="([^"]*)"', labels or '')), float(value)))
+    return series
+
+
+def histogram_quantiles(series, name: str, by: str) -> Dict[str, Dict[str, Any]]:
+    buckets: Dict[str, Dict[float, float]] = defaultdict(lambda: defaultdict(float))
+    for labels, value in series.get(f'{name}_bucket', []):
+        le = float('inf') if labels['le'] == '+Inf' else float(labels['le'])
+        buckets[labels.get(by, '')][le] += value
+        buckets['*'][le] += value
+    result = {}
+    for key, cumulative in buckets.items():
+        bounds = sorted(cumulative)
+        count = cumulative[bounds[-1]]
+        if not count:
+            continue
+
+        def q(quantile):
+            # верхняя граница бакета, в который попал квантиль
+            for bound in bounds:
+                if cumulative[bound] >= quantile * count:
+                    return None if bound == float('inf') else round(bound * 1000, 2)
+        result[key] = {'count': int(count), 'p50_ms': q(0.5), 'p99_ms': q(0.99)}
+    return result
+
+
+def sum_series(series, name: str) -> float:
+    return sum(value for _, value in series.get(name, []))
+
+
+async def run(args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix='tganon-load-')
+    api = FakeBotAPI(latency=args.api_latency_ms / 1000)
+    await api.start('127.0.0.1', args.api_port)
+    process = start_bot(workdir, f'http://127.0.0.1:{args.api_port}', args.metrics_port, args.real_limits)
+    rss: List[float] = []
+    sampler = None
+    try:
+        await wait_ready(api, process)
+        sampler = asyncio.create_task(sample_rss(process.pid, rss))
+        scenario = Scenario(api, args.users, args.messages, args.concurrency, args.timeout, args.seed)
+        started = time.perf_counter()
+        phases = await scenario.run()
+        elapsed = time.perf_counter() - started
+        series = parse_metrics(await scrape(args.metrics_port))
+    finally:
+        if sampler:
+            sampler.cancel()
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        await api.stop()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'args': vars(args),
+        'updates': scenario.updates,
+        'seconds': round(elapsed, 3),
+        'updates_per_sec': round(scenario.updates / elapsed, 1),
+        'phases_s': phases,
+        'reply_latency_ms': {
+            name: {'count': len(values),
+                   'p50': round(percentile(values, 0.5) * 1000, 2),
+                   'p99': round(percentile(values, 0.99) * 1000, 2)}
+            for name, values in scenario.latency.items()
+        },
+        'failures': dict(scenario.failures),
+        'handler_ms': histogram_quantiles(series, 'tganon_handler_seconds', 'handler'),
+        'db_seconds_total': round(sum_series(series, 'tganon_db_query_seconds_sum'), 3),
+        'db_queries': int(sum_series(series, 'tganon_db_query_seconds_count')),
+        'rss_mb': {'peak': round(max(rss), 1), 'last': round(rss[-1], 1)} if rss else None,
+        'api_calls': dict(api.calls),
+        'workdir': workdir if args.keep else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--messages', type=int, default=10, help='messages relayed per pair')
+    parser.add_argument('--concurrency', type=int, default=200, help='users acting at once')
+    parser.add_argument('--timeout', type=float, default=30, help='seconds to wait for each reply')
+    parser.add_argument('--api-port', type=int, default=8081)
+    parser.add_argument('--metrics-port', type=int, default=9109)
+    parser.add_argument('--api-latency-ms', type=float, default=0, help='simulated Bot API round trip')
+    parser.add_argument('--real-limits', action='store_true', help='keep Telegram rate limits in OutboundScheduler')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help='keep the bot work dir (bot.log, anon_chat.db)')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(f"{result['updates']} updates in {result['seconds']} s: {result['updates_per_sec']} updates/s")
+    for name, s in result['reply_latency_ms'].items():
+        print(f"  reply {name:>12}: n={s['count']:<6} p50 {s['p50']} ms  p99 {s['p99']} ms")
+    overall = result['handler_ms'].get('*')
+    if overall:
+        print(f"  handlers: p50 {overall['p50_ms']} ms  p99 {overall['p99_ms']} ms (bucket bounds)")
+    print(f"  DB: {result['db_queries']} calls, {result['db_seconds_total']} s  RSS: {result['rss_mb']}")
+    if result['failures']:
+        print(f"  timeouts: {result['failures']}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import traceback
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+from database import AsyncDatabase
+from outbound import PRIORITY_BROADCAST, outbound_priority
+
+logger = logging.getLogger(__name__)
+
+# Скорость ограничивает OutboundScheduler, здесь только число запросов в полёте
+BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', '20'))
+BROADCAST_CHUNK = int(os.getenv('BROADCAST_CHUNK', '500'))
+PROGRESS_INTERVAL = 15  # секунд между обновлениями прогресса у админа
+# Аренда задачи инстансом; продлевается по ходу рассылки, брошенную подхватит другой инстанс
+BROADCAST_LEASE = int(os.getenv('BROADCAST_LEASE', '300'))
+
+
+class BroadcastManager:
+    """Runs broadcasts as background jobs.
+
+    Recipients are read from `users` in chunks ordered by user_id; after every
+    chunk the last user_id is saved, so a job interrupted by a restart
+    continues from the last finished chunk (at most one chunk is resent).
+
+    With several instances on one database a job is run only by the instance
+    holding its lease (broadcast_jobs.owner/lease_until). The lease is
+    renewed while sending; a job whose owner died is picked up by the next
+    `resume_unfinished()` call on any instance after the lease runs out.
+    """
+
+    def __init__(self, bot: Bot, db: AsyncDatabase, lease: int = BROADCAST_LEASE):
+        self.bot = bot
+        self.db = db
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.tasks: Dict[int, asyncio.Task] = {}
+
+    async def start(self, admin_chat_id: int, text: str) -> int:
+        job = {
+            'id': await self.db.create_broadcast_job(admin_chat_id, text, await self.db.count_users()),
+            'admin_chat_id': admin_chat_id,
+            'text': text,
+            'last_user_id': 0,
+            'sent': 0,
+            'failed': 0,
+        }
+        await self.db.claim_broadcast_job(job['id'], self.owner, self.lease)
+        self._spawn(job)
+        return job['id']
+
+    async def resume_unfinished(self) -> int:
+        resumed = 0
+        for job in await self.db.get_unfinished_broadcast_jobs():
+            if job['id'] in self.tasks:
+                continue
+            if not await self.db.claim_broadcast_job(job['id'], self.owner, self.lease):
+                continue  # ведёт другой инстанс
+            logger.info(f"Resuming broadcast #{job['id']} after user {job['last_user_id']}")
+            self._spawn(job)
+            resumed += 1
+        return resumed
+
+    async def stop(self):
+        # Задачи остаются running; аренда снимается, чтобы другой инстанс продолжил сразу
+        tasks = list(self.tasks.items())
+        for _, task in tasks:
+            task.cancel()
+        await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+        for job_id, _ in tasks:
+            await self.db.release_broadcast_job(job_id, self.owner)
+
+    def _spawn(self, job: dict):
+        task = asyncio.create_task(self._run(job))
+        self.tasks[job['id']] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job['id'], None))
+
+    async def _send(self, user_id: int, text: str) -> bool:
+        # TelegramRetryAfter повторяет OutboundScheduler, сюда доходит только окончательная ошибка
+        try:
+            await self.bot.send_message(user_id, text, parse_mode=ParseMode.HTML)
+            return True
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Пользователь заблокировал бота или чат не существует
+            logger.debug(f"Broadcast failed to {user_id}: {e}")
+            return False
+        except Exception as e:
+            logger.warning(f"Broadcast failed to {user_id}: {e}")
+            return False
+
+    async def _report(self, job: dict, progress_message_id: Optional[int], total: int, final: bool = False):
+        done = job['sent'] + job['failed']
+        if final:
+            text = (
+                f"✅ Рассылка #{job['id']} завершена!\n"
+                f"👥 Всего пользователей: {done}\n"
+                f"✅ Успешно отправлено: {job['sent']}\n"
+                f"❌ Не удалось: {job['failed']}\n"
+                f"📊 Процент доставки: {(job['sent'] / done * 100) if done > 0 else 0:.1f}%"
+            )
+        else:
+            text = (
+                f"⏳ Рассылка #{job['id']}: {done}/{total}\n"
+                f"✅ {job['sent']}  ❌ {job['failed']}"
+            )
+        try:
+            if progress_message_id and not final:
+                await self.bot.edit_message_text(text, chat_id=job['admin_chat_id'], message_id=progress_message_id)
+                return progress_message_id
+            msg = await self.bot.send_message(job['admin_chat_id'], text)
+            return msg.message_id
+        except Exception as e:
+            logger.warning(f"Broadcast #{job['id']} progress report failed: {e}")
+            return progress_message_id
+
+    async def _run(self, job: dict):
+        outbound_priority.set(PRIORITY_BROADCAST)
+        job_id = job['id']
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+
+        async def send_one(user_id: int) -> bool:
+            async with semaphore:
+                return await self._send(user_id, job['text'])
+
+        try:
+            total = await self.db.count_users()
+            progress_message_id = await self._report(job, None, total)
+            last_report = last_claim = time.monotonic()
+            while True:
+                chunk = await self.db.get_user_ids_after(job['last_user_id'], BROADCAST_CHUNK)
+                if not chunk:
+                    break
+                results = await asyncio.gather(*(send_one(uid) for uid in chunk))
+                sent = sum(results)
+                job['sent'] += sent
+                job['failed'] += len(results) - sent
+                job['last_user_id'] = chunk[-1]
+                await self.db.update_broadcast_progress(job_id, job['last_user_id'], job['sent'], job['failed'])
+                if time.monotonic() - last_claim >= self.lease / 3:
+                    if not await self.db.claim_broadcast_job(job_id, self.owner, self.lease):
+                        logger.warning(f"Broadcast #{job_id} lease lost at user {job['last_user_id']}, stopping")
+                        return
+                    last_claim = time.monotonic()
+                if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                    progress_message_id = await self._report(job, progress_message_id, total)
+                    last_report = time.monotonic()
+            await self.db.finish_broadcast_job(job_id, 'done')
+            await self._report(job, progress_message_id, total, final=True)
+            logger.info(
+                f"Broadcast #{job_id} done: success={job['sent']} fail={job['failed']} "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        except asyncio.CancelledError:
+            # Остановка бота: задача остаётся в статусе running и продолжится при старте
+            logger.info(f"Broadcast #{job_id} interrupted at user {job['last_user_id']}")
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast #{job_id} error: {e}\n{traceback.format_exc()}")
+            await self.db.finish_broadcast_job(job_id, 'failed')
@@ -0,0 +1,191 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import zlib
+from typing import Any, Dict, List, Optional
+
+from aiogram.types import Message
+
+from relay import content_type
+
+logger = logging.getLogger(__name__)
+
+
+class ChatArchive:
+    """Local append-only archive of relayed messages.
+
+    Records are written in batches: every batch becomes one gzip member
+    appended to the current segment file (`seg-<n>.jsonl.gz`), and a new
+    segment is started once the current one exceeds `segment_bytes`.
+    A small SQLite index keeps (ts, sender, receiver, segment, offset, line)
+    per record, so reading a page of history only decompresses the members
+    that contain it.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 maxsize: int = 10000, window: float = 1.0, max_batch: int = 500):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.window = window
+        self.max_batch = max_batch
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.written = 0
+        self.dropped = 0
+        self._worker: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self.index = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False)
+        self.index.execute('''
+        CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts INTEGER,
+            sender_id INTEGER,
+            receiver_id INTEGER,
+            segment TEXT,
+            offset INTEGER,
+            line INTEGER
+        )
+        ''')
+        self.index.execute('CREATE INDEX IF NOT EXISTS idx_records_sender ON records (sender_id, ts)')
+        self.index.execute('CREATE INDEX IF NOT EXISTS idx_records_receiver ON records (receiver_id, ts)')
+        self.index.commit()
+        self.segment = self._last_segment()
+
+    # ---------- segments ----------
+    def _segment_path(self, segment: str) -> str:
+        return os.path.join(self.directory, segment)
+
+    def _last_segment(self) -> str:
+        segments = sorted(
+            (name for name in os.listdir(self.directory) if name.startswith('seg-')),
+            key=lambda name: int(name.split('-')[1].split('.')[0])
+        )
+        return segments[-1] if segments else 'seg-1.jsonl.gz'
+
+    def _rotate_if_needed(self):
+        path = self._segment_path(self.segment)
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+            number = int(self.segment.split('-')[1].split('.')[0]) + 1
+            self.segment = f'seg-{number}.jsonl.gz'
+            logger.info(f"Chat archive rotated to {self.segment}")
+
+    # ---------- writes ----------
+    def submit(self, message: Message, receiver_id: int):
+        kind = content_type(message)
+        if not kind:
+            return
+        record = {
+            'ts': int(time.time()),
+            'sender_id': message.from_user.id,
+            'receiver_id': receiver_id,
+            'username': message.from_user.username,
+            'kind': kind,
+            'text': message.text if kind == 'text' else message.caption,
+            'file_id': None if kind == 'text' else (
+                message.photo[-1].file_id if kind == 'photo' else getattr(message, kind).file_id
+            ),
+        }
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning(f"Chat archive queue full, dropped {self.dropped} records")
+
+    def write_batch(self, records: List[Dict[str, Any]]):
+        payload = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records).encode('utf-8')
+        with self._lock:
+            self._rotate_if_needed()
+            path = self._segment_path(self.segment)
+            offset = os.path.getsize(path) if os.path.exists(path) else 0
+            # Каждая пачка - отдельный gzip member, файл только дописывается
+            with open(path, 'ab') as f:
+                f.write(gzip.compress(payload))
+                f.flush()
+                os.fsync(f.fileno())
+            self.index.executemany(
+                'INSERT INTO records (ts, sender_id, receiver_id, segment, offset, line) VALUES (?, ?, ?, ?, ?, ?)',
+                [(r['ts'], r['sender_id'], r['receiver_id'], self.segment, offset, i) for i, r in enumerate(records)]
+            )
+            self.index.commit()
+        self.written += len(records)
+
+    def start(self):
+        if not self._worker:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        if not self._worker:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Chat archive stopped with {self.queue.qsize()} records pending")
+        self._worker.cancel()
+        self._worker = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await asyncio.to_thread(self.write_batch, batch)
+            except Exception as e:
+                logger.error(f"Chat archive write failed: {e}\n{traceback.format_exc()}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    # ---------- reads ----------
+    def _read_member(self, segment: str, offset: int) -> List[str]:
+        decompressor = zlib.decompressobj(wbits=31)
+        parts = []
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            while not decompressor.eof:
+                chunk = f.read(64 * 1024)
+                if not chunk:
+                    break
+                parts.append(decompressor.decompress(chunk))
+        return b''.join(parts).decode('utf-8').splitlines()
+
+    def history(self, user_id: int, page: int = 0, page_size: int = 20) -> List[Dict[str, Any]]:
+        """Page of a user's messages (sent and received), newest first."""
+        with self._lock:
+            rows = self.index.execute('''
+            SELECT id, segment, offset, line FROM (
+                SELECT id, ts, segment, offset, line FROM records WHERE sender_id = ?
+                UNION ALL
+                SELECT id, ts, segment, offset, line FROM records WHERE receiver_id = ?
+            )
+            ORDER BY ts DESC, id DESC
+            LIMIT ? OFFSET ?
+            ''', (user_id, user_id, page_size, page * page_size)).fetchall()
+        members: Dict[tuple, List[str]] = {}
+        result = []
+        for _, segment, offset, line in rows:
+            key = (segment, offset)
+            if key not in members:
+                members[key] = self._read_member(segment, offset)
+            result.append(json.loads(members[key][line]))
+        return result
+
+    def close(self):
+        with self._lock:
+            self.index.close()
@@ -0,0 +1,598 @@
+import asyncio
+import functools
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiomysql
+
+import metrics
+from feed_index import FeedIndex
+from partner_map import PartnerMap
+from stats import LiveStats
+from tracing import record_span
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        user_id BIGINT PRIMARY KEY,
+        username VARCHAR(255),
+        full_name VARCHAR(255),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS posts (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        user_id BIGINT NOT NULL,
+        text TEXT,
+        created_at BIGINT NOT NULL,
+        UNIQUE KEY idx_posts_user (user_id),
+        KEY idx_posts_created (created_at)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS chats (
+        user1_id BIGINT NOT NULL,
+        user2_id BIGINT NOT NULL,
+        created_at BIGINT NOT NULL,
+        last_activity BIGINT,
+        PRIMARY KEY (user1_id, user2_id),
+        KEY idx_chats_user2 (user2_id),
+        KEY idx_chats_created (created_at),
+        KEY idx_chats_activity (last_activity)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS chat_members (
+        user_id BIGINT PRIMARY KEY
+    )
+    ''',
+    # Резерв собеседников для чатов, созданных до chat_members; идемпотентно
+    '''
+    INSERT IGNORE INTO chat_members (user_id)
+    SELECT user1_id FROM chats UNION SELECT user2_id FROM chats
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS message_mirror (
+        sender_id BIGINT NOT NULL,
+        receiver_id BIGINT NOT NULL,
+        sender_message_id BIGINT NOT NULL,
+        receiver_message_id BIGINT,
+        created_at BIGINT NOT NULL,
+        PRIMARY KEY (sender_id, sender_message_id),
+        KEY idx_mirror_receiver (receiver_id, sender_message_id),
+        KEY idx_mirror_created (created_at)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS subscriptions (
+        user_id BIGINT PRIMARY KEY,
+        expires_at BIGINT,
+        permanent TINYINT DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS interactions (
+        user1_id BIGINT NOT NULL,
+        user2_id BIGINT NOT NULL,
+        expires_at BIGINT NOT NULL,
+        PRIMARY KEY (user1_id, user2_id),
+        KEY idx_interactions_expires (expires_at)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS drafts (
+        user_id BIGINT PRIMARY KEY,
+        text TEXT,
+        created_at BIGINT NOT NULL,
+        KEY idx_drafts_created (created_at)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS broadcast_jobs (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        admin_chat_id BIGINT,
+        text TEXT,
+        status VARCHAR(16) DEFAULT 'running',
+        last_user_id BIGINT DEFAULT 0,
+        sent INT DEFAULT 0,
+        failed INT DEFAULT 0,
+        total INT DEFAULT 0,
+        created_at BIGINT,
+        finished_at BIGINT,
+        owner VARCHAR(255),
+        lease_until BIGINT
+    )
+    ''',
+]
+
+# Колонки, добавленные после первой версии SCHEMA: в существующие таблицы
+# CREATE TABLE IF NOT EXISTS их не добавит. (таблица, колонка, запросы миграции)
+COLUMNS = [
+    ('chats', 'last_activity', (
+        'ALTER TABLE chats ADD COLUMN last_activity BIGINT, ADD KEY idx_chats_activity (last_activity)',
+        'UPDATE chats SET last_activity = created_at',
+    )),
+    ('broadcast_jobs', 'owner', (
+        'ALTER TABLE broadcast_jobs ADD COLUMN owner VARCHAR(255), ADD COLUMN lease_until BIGINT',
+    )),
+]
+
+
+def _timed(func):
+    # Та же метрика и те же span'ы, что у AsyncDatabase._run
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(self, *args, **kwargs)
+        finally:
+            metrics.DB_SECONDS.observe(time.perf_counter() - started, func.__name__)
+            record_span('db', func.__name__, started)
+    return wrapper
+
+
+class MySQLDatabase:
+    """MySQL/MariaDB backend with the same async methods as AsyncDatabase.
+
+    Several bot instances can share one database. Chat partners are read
+    from the chats table, so a chat ended on one instance is seen by all,
+    and chat_members (one row per user in a chat) makes create_chat fail
+    for a user another instance has just paired.
+    The feed index, partner map and counters are per-process caches,
+    reloaded every `refresh_seconds`.
+    """
+
+    def __init__(self, url: str, pool_minsize: int = 1, pool_maxsize: int = 10, refresh_seconds: float = 30):
+        parsed = urlparse(url)
+        self.user = parsed.username
+        self.password = parsed.password
+        self.host = parsed.hostname
+        self.port = parsed.port or 3306
+        self.db = parsed.path.lstrip('/')
+        self.pool_minsize = pool_minsize
+        self.pool_maxsize = pool_maxsize
+        self.refresh_seconds = refresh_seconds
+        self.pool = None
+        self.feed = FeedIndex()
+        self.partners = PartnerMap()
+        self.stats = LiveStats()
+        self._refresher: Optional[asyncio.Task] = None
+        self.shared = True  # карта собеседников - только кэш, решает база
+
+    async def connect(self):
+        self.pool = await aiomysql.create_pool(
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            db=self.db,
+            port=self.port,
+            minsize=self.pool_minsize,
+            maxsize=self.pool_maxsize,
+            autocommit=True
+        )
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                for statement in SCHEMA:
+                    await cur.execute(statement)
+                for table, column, statements in COLUMNS:
+                    await cur.execute('''
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+                    ''', (table, column))
+                    if await cur.fetchone():
+                        continue
+                    for statement in statements:
+                        await cur.execute(statement)
+        await self.warm_caches()
+
+    async def _fetchall(self, sql: str, args: tuple = ()) -> List[tuple]:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, args)
+                return list(await cur.fetchall())
+
+    async def _fetchone(self, sql: str, args: tuple = ()) -> Optional[tuple]:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, args)
+                return await cur.fetchone()
+
+    async def _execute(self, sql: str, args: tuple = ()) -> Tuple[int, int]:
+        # Возвращает (rowcount, lastrowid)
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, args)
+                return cur.rowcount, cur.lastrowid
+
+    # ---------- Caches ----------
+    async def warm_caches(self):
+        posts = await self._fetchall('SELECT user_id, text, created_at FROM posts')
+        chats = await self._fetchall('SELECT user1_id, user2_id FROM chats')
+        self.feed.clear()
+        for user_id, text, created_ts in posts:
+            self.feed.add_post(user_id, text, created_ts)
+        for user1_id, user2_id in chats:
+            self.feed.set_busy(user1_id, user2_id)
+        self.partners.load(chats)
+        await self.reconcile_stats()
+
+    def start_flusher(self):
+        # Записи коммитятся сразу (autocommit); здесь - обновление кэшей от других инстансов
+        if self.refresh_seconds and not self._refresher:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.warm_caches()
+            except Exception as e:
+                logger.error(f"MySQL cache refresh error: {e}")
+
+    async def flush(self):
+        return None
+
+    async def aclose(self):
+        if self._refresher:
+            self._refresher.cancel()
+            self._refresher = None
+        self.close()
+        if self.pool:
+            await self.pool.wait_closed()
+
+    def close(self):
+        if self.pool:
+            self.pool.close()
+
+    # ---------- Stats ----------
+    @_timed
+    async def reconcile_stats(self) -> Dict[str, int]:
+        users = (await self._fetchone('SELECT COUNT(*) FROM users'))[0]
+        chats = (await self._fetchone('SELECT COUNT(*) FROM chats'))[0]
+        posts = (await self._fetchone('SELECT COUNT(*) FROM posts'))[0]
+        recent = [row[0] for row in await self._fetchall(
+            'SELECT created_at FROM posts WHERE created_at > %s ORDER BY created_at', (int(time.time()) - 24 * 3600,)
+        )]
+        drift = {
+            'users': users - self.stats.users,
+            'chats': chats - len(self.partners),
+            'posts': posts - len(self.feed),
+            'posts_24h': len(recent) - self.stats.posts_24h.total(),
+        }
+        self.stats.users = users
+        self.stats.posts_24h.clear()
+        for created_ts in recent:
+            self.stats.posts_24h.add(ts=created_ts)
+        self.stats.reconciled_at = time.time()
+        return {key: value for key, value in drift.items() if value}
+
+    def live_stats(self) -> Dict[str, int]:
+        return {
+            'users': self.stats.users,
+            'active_chats': len(self.partners),
+            'posts': len(self.feed),
+            'posts_24h': self.stats.posts_24h.total(),
+            'searching': len(self.stats.searching),
+            'relayed_per_minute': self.stats.relayed.total(),
+        }
+
+    @_timed
+    async def check_partner_consistency(self, repair: bool = True) -> int:
+        chats = await self._fetchall('SELECT user1_id, user2_id FROM chats')
+        mismatches = self.partners.diff(chats)
+        for user_id, in_map, in_db in mismatches[:20]:
+            logger.warning(f"Partner map mismatch for {user_id}: map={in_map} db={in_db}")
+        if mismatches and repair:
+            self.partners.load(chats)
+        return len(mismatches)
+
+    # ---------- Users and posts ----------
+    @_timed
+    async def add_user(self, user_id: int, username: str, full_name: str):
+        rows, _ = await self._execute(
+            'INSERT IGNORE INTO users (user_id, username, full_name) VALUES (%s, %s, %s)',
+            (user_id, username, full_name)
+        )
+        if rows > 0:
+            self.stats.users += 1
+
+    @_timed
+    async def add_post(self, user_id: int, text: str):
+        now = int(time.time())
+        await self._execute('''
+            INSERT INTO posts (user_id, text, created_at) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE text=VALUES(text), created_at=VALUES(created_at)
+        ''', (user_id, text, now))
+        previous = self.feed.add_post(user_id, text, now)
+        if previous is None or previous <= now - 24 * 3600:
+            self.stats.posts_24h.add(ts=now)  # замена свежего поста - не новый пост
+
+    @_timed
+    async def get_post(self, user_id: int) -> Optional[Dict[str, Any]]:
+        row = await self._fetchone('SELECT user_id, text, created_at FROM posts WHERE user_id = %s', (user_id,))
+        if row:
+            return {'user_id': row[0], 'text': row[1], 'created_at': row[2]}
+        return None
+
+    @_timed
+    async def get_posts_raw(self) -> List[Dict[str, Any]]:
+        rows = await self._fetchall('SELECT user_id, text, created_at FROM posts')
+        return [{'user_id': row[0], 'text': row[1], 'created_at': row[2]} for row in rows]
+
+    @_timed
+    async def get_active_posts(self, max_age_seconds: int = 18000) -> List[Dict[str, Any]]:
+        rows = await self._fetchall('SELECT user_id, text, created_at FROM posts WHERE created_at > %s',
+                                    (int(time.time()) - max_age_seconds,))
+        return [{'user_id': row[0], 'text': row[1], 'created_at': row[2]} for row in rows]
+
+    @_timed
+    async def delete_post(self, user_id: int) -> bool:
+        rows, _ = await self._execute('DELETE FROM posts WHERE user_id = %s', (user_id,))
+        self.feed.remove_post(user_id)
+        return rows > 0
+
+    async def delete_old_posts(self, older_than_seconds: int = 18000, batch: int = 500) -> int:
+        cutoff = int(time.time()) - older_than_seconds
+        deleted = 0
+        while True:
+            rows = await self.delete_posts_batch(cutoff, batch)
+            deleted += rows
+            if rows < batch:
+                return deleted
+
+    @_timed
+    async def count_posts_since(self, seconds: int) -> int:
+        row = await self._fetchone('SELECT COUNT(*) FROM posts WHERE created_at > %s', (int(time.time()) - seconds,))
+        return row[0]
+
+    # ---------- Retention ----------
+    @_timed
+    async def delete_posts_batch(self, cutoff: int, limit: int) -> int:
+        rows, _ = await self._execute('DELETE FROM posts WHERE created_at <= %s LIMIT %s', (cutoff, limit))
+        if rows < limit:
+            self.feed.remove_older_than(cutoff)
+        return rows
+
+    @_timed
+    async def get_idle_chats(self, cutoff: int, limit: int) -> List[Tuple[int, int]]:
+        return await self._fetchall('SELECT user1_id, user2_id FROM chats WHERE last_activity <= %s LIMIT %s',
+                                    (cutoff, limit))
+
+    async def touch_chat(self, user1_id: int, user2_id: int):
+        # Не чаще раза в ACTIVITY_RESOLUTION на пару и инстанс
+        now = int(time.time())
+        if self.partners.touch(user1_id, user2_id, now):
+            await self._touch_chat(user1_id, user2_id, now)
+
+    @_timed
+    async def _touch_chat(self, user1_id: int, user2_id: int, now: int):
+        await self._execute('''
+            UPDATE chats SET last_activity = %s
+            WHERE (user1_id = %s AND user2_id = %s) OR (user1_id = %s AND user2_id = %s)
+        ''', (now, user1_id, user2_id, user2_id, user1_id))
+
+    @_timed
+    async def delete_mirror_batch(self, cutoff: int, limit: int) -> int:
+        rows, _ = await self._execute('DELETE FROM message_mirror WHERE created_at <= %s LIMIT %s', (cutoff, limit))
+        return rows
+
+    # ---------- Chats ----------
+    @_timed
+    async def create_chat(self, user1_id: int, user2_id: int) -> bool:
+        # Резерв в chat_members и чат - одна транзакция: из инстансов, сводящих того же
+        # пользователя одновременно, успеет один; остальные получат False
+        now = int(time.time())
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await conn.begin()
+                try:
+                    await cur.execute('INSERT INTO chat_members (user_id) VALUES (%s), (%s)', (user1_id, user2_id))
+                    await cur.execute('''
+                        INSERT INTO chats (user1_id, user2_id, created_at, last_activity) VALUES (%s, %s, %s, %s)
+                    ''', (user1_id, user2_id, now, now))
+                    await conn.commit()
+                except aiomysql.IntegrityError:
+                    await conn.rollback()
+                    return False
+                except Exception:
+                    await conn.rollback()
+                    raise
+        self.feed.set_busy(user1_id, user2_id)
+        self.partners.link(user1_id, user2_id)
+        return True
+
+    async def get_active_chat_partner(self, user_id: int) -> Optional[int]:
+        # Из таблицы, а не из карты: чат мог закончиться на другом инстансе
+        return await self.get_active_chat_partner_db(user_id)
+
+    @_timed
+    async def get_active_chat_partner_db(self, user_id: int) -> Optional[int]:
+        row = await self._fetchone('''
+            (SELECT user2_id FROM chats WHERE user1_id = %s LIMIT 1)
+            UNION ALL
+            (SELECT user1_id FROM chats WHERE user2_id = %s LIMIT 1)
+            LIMIT 1
+        ''', (user_id, user_id))
+        return row[0] if row else None
+
+    @_timed
+    async def end_chat(self, user_id: int):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute('''
+                    SELECT user2_id FROM chats WHERE user1_id = %s
+                    UNION ALL
+                    SELECT user1_id FROM chats WHERE user2_id = %s
+                ''', (user_id, user_id))
+                members = {row[0] for row in await cur.fetchall()}
+                await conn.begin()
+                try:
+                    await cur.execute('DELETE FROM chats WHERE user1_id = %s', (user_id,))
+                    await cur.execute('DELETE FROM chats WHERE user2_id = %s', (user_id,))
+                    # Только собеседники по таблице: карта могла устареть, а её пользователь - быть уже в другом чате
+                    released = [user_id, *members]
+                    await cur.execute(
+                        f"DELETE FROM chat_members WHERE user_id IN ({', '.join(['%s'] * len(released))})",
+                        released)
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+        partner_id = self.partners.unlink(user_id)
+        if partner_id is not None:
+            members.add(partner_id)
+        for member_id in members:
+            self.partners.unlink(member_id)
+        self.feed.set_free(user_id, *members)
+
+    @_timed
+    async def count_active_chats(self) -> int:
+        return (await self._fetchone('SELECT COUNT(*) FROM chats'))[0]
+
+    @_timed
+    async def get_all_users(self) -> List[int]:
+        return [row[0] for row in await self._fetchall('SELECT user_id FROM users')]
+
+    # ---------- Message mirror ----------
+    @_timed
+    async def save_message_mirror(self, sender_id, receiver_id, sender_message_id, receiver_message_id):
+        await self._execute('''
+            REPLACE INTO message_mirror
+            (sender_id, receiver_id, sender_message_id, receiver_message_id, created_at)
+            VALUES (%s, %s, %s, %s, %s)
+        ''', (sender_id, receiver_id, sender_message_id, receiver_message_id, int(time.time())))
+
+    @_timed
+    async def get_mirrored_message_id(self, receiver_id, sender_message_id):
+        row = await self._fetchone('''
+            SELECT receiver_message_id FROM message_mirror
+            WHERE receiver_id = %s AND sender_message_id = %s
+        ''', (receiver_id, sender_message_id))
+        return row[0] if row else None
+
+    # ---------- Subscriptions ----------
+    @_timed
+    async def set_subscription(self, user_id: int, months: int = 0, permanent: bool = False):
+        now = int(time.time())
+        if permanent:
+            expires_at = now + 100 * 365 * 24 * 3600  # фактически "навсегда"
+        else:
+            expires_at = now + months * 30 * 24 * 3600
+        await self._execute('''
+            INSERT INTO subscriptions (user_id, expires_at, permanent) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE expires_at=VALUES(expires_at), permanent=VALUES(permanent)
+        ''', (user_id, expires_at, int(permanent)))
+
+    @_timed
+    async def has_active_subscription(self, user_id: int):
+        row = await self._fetchone('SELECT expires_at, permanent FROM subscriptions WHERE user_id = %s', (user_id,))
+        if not row:
+            return False
+        expires_at, permanent = row
+        if permanent:
+            return True
+        return expires_at > int(time.time())
+
+    # ---------- Interactions ----------
+    @_timed
+    async def save_interaction(self, user1_id: int, user2_id: int, expires_at: int):
+        await self._execute('''
+            INSERT INTO interactions (user1_id, user2_id, expires_at) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE expires_at=VALUES(expires_at)
+        ''', (min(user1_id, user2_id), max(user1_id, user2_id), expires_at))
+
+    @_timed
+    async def get_interactions(self) -> List[tuple]:
+        return await self._fetchall('SELECT user1_id, user2_id, expires_at FROM interactions WHERE expires_at > %s',
+                                    (int(time.time()),))
+
+    @_timed
+    async def delete_expired_interactions(self) -> int:
+        rows, _ = await self._execute('DELETE FROM interactions WHERE expires_at <= %s', (int(time.time()),))
+        return rows
+
+    # ---------- Drafts ----------
+    @_timed
+    async def save_drafts(self, drafts: List[tuple]):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany('''
+                    INSERT INTO drafts (user_id, text, created_at) VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE text=VALUES(text), created_at=VALUES(created_at)
+                ''', [(user_id, text, int(created)) for user_id, text, created in drafts])
+
+    @_timed
+    async def pop_draft(self, user_id: int, max_age_seconds: int) -> Optional[str]:
+        row = await self._fetchone('SELECT text, created_at FROM drafts WHERE user_id = %s', (user_id,))
+        if not row:
+            return None
+        await self._execute('DELETE FROM drafts WHERE user_id = %s', (user_id,))
+        text, created_at = row
+        return text if created_at > int(time.time()) - max_age_seconds else None
+
+    @_timed
+    async def delete_draft(self, user_id: int):
+        await self._execute('DELETE FROM drafts WHERE user_id = %s', (user_id,))
+
+    @_timed
+    async def delete_old_drafts(self, older_than_seconds: int) -> int:
+        rows, _ = await self._execute('DELETE FROM drafts WHERE created_at <= %s',
+                                      (int(time.time()) - older_than_seconds,))
+        return rows
+
+    # ---------- Broadcast jobs ----------
+    @_timed
+    async def count_users(self) -> int:
+        return (await self._fetchone('SELECT COUNT(*) FROM users'))[0]
+
+    @_timed
+    async def get_user_ids_after(self, after_user_id: int, limit: int = 500) -> List[int]:
+        rows = await self._fetchall('SELECT user_id FROM users WHERE user_id > %s ORDER BY user_id LIMIT %s',
+                                    (after_user_id, limit))
+        return [row[0] for row in rows]
+
+    @_timed
+    async def create_broadcast_job(self, admin_chat_id: int, text: str, total: int) -> int:
+        _, job_id = await self._execute('''
+            INSERT INTO broadcast_jobs (admin_chat_id, text, total, created_at) VALUES (%s, %s, %s, %s)
+        ''', (admin_chat_id, text, total, int(time.time())))
+        return job_id
+
+    @_timed
+    async def update_broadcast_progress(self, job_id: int, last_user_id: int, sent: int, failed: int):
+        await self._execute('UPDATE broadcast_jobs SET last_user_id=%s, sent=%s, failed=%s WHERE id=%s',
+                            (last_user_id, sent, failed, job_id))
+
+    @_timed
+    async def finish_broadcast_job(self, job_id: int, status: str = 'done'):
+        await self._execute('UPDATE broadcast_jobs SET status=%s, finished_at=%s WHERE id=%s',
+                            (status, int(time.time()), job_id))
+
+    @_timed
+    async def claim_broadcast_job(self, job_id: int, owner: str, lease_seconds: int) -> bool:
+        # Условный UPDATE атомарен: из инстансов, пришедших за одной задачей, строку получит один
+        now = int(time.time())
+        rows, _ = await self._execute('''
+            UPDATE broadcast_jobs SET owner=%s, lease_until=%s
+            WHERE id=%s AND status='running' AND (owner IS NULL OR owner=%s OR lease_until < %s)
+        ''', (owner, now + lease_seconds, job_id, owner, now))
+        return rows == 1
+
+    @_timed
+    async def release_broadcast_job(self, job_id: int, owner: str):
+        await self._execute('UPDATE broadcast_jobs SET owner=NULL, lease_until=NULL WHERE id=%s AND owner=%s',
+                            (job_id, owner))
+
+    @_timed
+    async def get_unfinished_broadcast_jobs(self) -> List[Dict[str, Any]]:
+        rows = await self._fetchall('''
+            SELECT id, admin_chat_id, text, last_user_id, sent, failed, total
+            FROM broadcast_jobs WHERE status = 'running' ORDER BY id
+        ''')
+        keys = ('id', 'admin_chat_id', 'text', 'last_user_id', 'sent', 'failed', 'total')
+        return [dict(zip(keys, row)) for row in rows]
@@ -0,0 +1,118 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+class FeedIndex:
+    """In-memory index of posts that can be shown in "Смотреть посты 🔍".
+
+    Holds active posts keyed by owner and the set of owners currently in a chat.
+    Owners that have a post and are not in a chat live in a flat list, so a
+    random eligible post is picked without touching SQLite.
+    """
+
+    def __init__(self, sample_attempts: int = 32):
+        self.sample_attempts = sample_attempts
+        self._lock = threading.Lock()
+        self._posts: Dict[int, Tuple[str, float]] = {}  # {owner_id: (text, created_ts)}
+        self._busy: Set[int] = set()                    # owners in an active chat
+        self._eligible: List[int] = []                  # owners with a post and no chat
+        self._pos: Dict[int, int] = {}                  # {owner_id: index in _eligible}
+
+    # ---------- eligible list (swap-remove, O(1)) ----------
+    def _push(self, owner_id: int):
+        if owner_id in self._pos:
+            return
+        self._pos[owner_id] = len(self._eligible)
+        self._eligible.append(owner_id)
+
+    def _drop(self, owner_id: int):
+        idx = self._pos.pop(owner_id, None)
+        if idx is None:
+            return
+        last = self._eligible.pop()
+        if idx < len(self._eligible):
+            self._eligible[idx] = last
+            self._pos[last] = idx
+
+    # ---------- mutations ----------
+    def add_post(self, owner_id: int, text: str, created_ts: Optional[float] = None) -> Optional[float]:
+        # Возвращает created_ts заменённого поста владельца, если он был
+        with self._lock:
+            previous = self._posts.get(owner_id)
+            self._posts[owner_id] = (text, created_ts if created_ts is not None else time.time())
+            if owner_id not in self._busy:
+                self._push(owner_id)
+            return previous[1] if previous else None
+
+    def remove_post(self, owner_id: int):
+        with self._lock:
+            self._posts.pop(owner_id, None)
+            self._drop(owner_id)
+
+    def remove_older_than(self, cutoff_ts: float) -> int:
+        with self._lock:
+            expired = [uid for uid, (_, ts) in self._posts.items() if ts <= cutoff_ts]
+            for uid in expired:
+                del self._posts[uid]
+                self._drop(uid)
+            return len(expired)
+
+    def set_busy(self, *user_ids: int):
+        with self._lock:
+            for uid in user_ids:
+                self._busy.add(uid)
+                self._drop(uid)
+
+    def set_free(self, *user_ids: int):
+        with self._lock:
+            for uid in user_ids:
+                self._busy.discard(uid)
+                if uid in self._posts:
+                    self._push(uid)
+
+    def clear(self):
+        with self._lock:
+            self._posts.clear()
+            self._busy.clear()
+            self._eligible.clear()
+            self._pos.clear()
+
+    # ---------- reads ----------
+    def __len__(self) -> int:
+        return len(self._posts)
+
+    def eligible_count(self) -> int:
+        return len(self._eligible)
+
+    def pick(self, viewer_id: int, allowed: Optional[Callable[[int], bool]] = None,
+             max_age_seconds: Optional[int] = None) -> Optional[Tuple[int, str]]:
+        """Random (owner_id, text) the viewer may see, or None.
+
+        First tries a few random probes; if they all hit filtered posts, falls
+        back to a scan starting at a random offset.
+        """
+        min_ts = time.time() - max_age_seconds if max_age_seconds else None
+
+        def ok(owner_id: int) -> bool:
+            if owner_id == viewer_id:
+                return False
+            if min_ts is not None and self._posts[owner_id][1] <= min_ts:
+                return False
+            return allowed is None or allowed(owner_id)
+
+        with self._lock:
+            n = len(self._eligible)
+            if not n:
+                return None
+            for _ in range(min(self.sample_attempts, n)):
+                owner_id = self._eligible[random.randrange(n)]
+                if ok(owner_id):
+                    return owner_id, self._posts[owner_id][0]
+            start = random.randrange(n)
+            for i in range(n):
+                owner_id = self._eligible[(start + i) % n]
+                if ok(owner_id):
+                    return owner_id, self._posts[owner_id][0]
+        return None
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import logging
+import time
+import traceback
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.types import (
+    InputMediaAudio,
+    InputMediaDocument,
+    InputMediaPhoto,
+    InputMediaVideo,
+    Message,
+)
+
+from outbound import PRIORITY_MIRROR, outbound_priority
+from relay import content_type, deliver
+
+logger = logging.getLogger(__name__)
+
+MAX_TEXT = 4000        # лимит Telegram 4096 символов, с запасом
+MAX_MEDIA_GROUP = 10   # лимит send_media_group
+
+# Какие типы можно объединять в один альбом
+MEDIA_GROUPS = {
+    'photo': ('visual', InputMediaPhoto),
+    'video': ('visual', InputMediaVideo),
+    'document': ('document', InputMediaDocument),
+    'audio': ('audio', InputMediaAudio),
+}
+
+
+def _file_id(message: Message, kind: str) -> str:
+    if kind == 'photo':
+        return message.photo[-1].file_id
+    return getattr(message, kind).file_id
+
+
+class LogMirror:
+    """Copies relayed messages to the admin log chat in the background.
+
+    Entries are buffered for `window` seconds: text lines are merged into
+    digest messages, photos/videos, documents and audio are sent as albums.
+    When the queue is full, new entries are written to `spill_path` (JSON
+    lines) if it is set, otherwise dropped; both are counted.
+    """
+
+    def __init__(self, bot: Bot, chat_id, maxsize: int = 1000, window: float = 2.0,
+                 max_batch: int = 200, spill_path: Optional[str] = None):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.window = window
+        self.max_batch = max_batch
+        self.spill_path = spill_path
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.sent = 0       # записей доставлено
+        self.api_calls = 0  # запросов к Bot API
+        self.dropped = 0
+        self.spilled = 0
+        self.failed = 0
+        self._worker: Optional[asyncio.Task] = None
+
+    def submit(self, message: Message):
+        if not self.chat_id:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            if self.spill_path and self._spill(message):
+                return
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning(f"Log mirror queue full, dropped {self.dropped} messages")
+
+    def _spill(self, message: Message) -> bool:
+        kind = content_type(message)
+        entry = {
+            'ts': int(time.time()),
+            'user_id': message.from_user.id,
+            'username': message.from_user.username,
+            'kind': kind,
+            'text': message.text if kind == 'text' else message.caption,
+            'file_id': _file_id(message, kind) if kind and kind != 'text' else None,
+        }
+        try:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        except OSError as e:
+            logger.warning(f"Log mirror spill failed: {e}")
+            return False
+        self.spilled += 1
+        return True
+
+    def start(self):
+        if not self._worker:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0):
+        # Досылаем то, что уже в очереди, но не дольше timeout
+        if not self._worker:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Log mirror stopped with {self.queue.qsize()} messages pending")
+        self._worker.cancel()
+        self._worker = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'queued': self.queue.qsize(),
+            'sent': self.sent,
+            'api_calls': self.api_calls,
+            'dropped': self.dropped,
+            'spilled': self.spilled,
+            'failed': self.failed,
+        }
+
+    async def _send_digest(self, lines: List[str]):
+        chunk = ""
+        for line in lines:
+            line = line[:MAX_TEXT]
+            if chunk and len(chunk) + len(line) + 1 > MAX_TEXT:
+                await self.bot.send_message(self.chat_id, chunk)
+                self.api_calls += 1
+                chunk = ""
+            chunk = chunk + "\n" + line if chunk else line
+        if chunk:
+            await self.bot.send_message(self.chat_id, chunk)
+            self.api_calls += 1
+
+    async def _send_group(self, media: list):
+        for i in range(0, len(media), MAX_MEDIA_GROUP):
+            part = media[i:i + MAX_MEDIA_GROUP]
+            if len(part) == 1:
+                message, kind, caption = part[0]
+                await deliver(self.bot, self.chat_id, message, kind, caption=caption)
+            else:
+                await self.bot.send_media_group(self.chat_id, [
+                    MEDIA_GROUPS[kind][1](media=_file_id(message, kind), caption=caption)
+                    for message, kind, caption in part
+                ])
+            self.api_calls += 1
+
+    async def _flush(self, batch: List[Message]):
+        lines: List[str] = []
+        groups: Dict[str, list] = {}
+        singles = []
+        for message in batch:
+            kind = content_type(message)
+            if not kind:
+                continue
+            username = "@" + (message.from_user.username or "")
+            if kind == 'text':
+                lines.append(username + " " + message.text)
+            elif kind in MEDIA_GROUPS:
+                caption = username + " " + (message.caption or "")
+                groups.setdefault(MEDIA_GROUPS[kind][0], []).append((message, kind, caption))
+            else:
+                # voice, video_note, sticker: без подписи, автор попадает в дайджест
+                lines.append(f"{username} [{kind}]")
+                singles.append((message, kind))
+
+        if lines:
+            await self._send_digest(lines)
+        for media in groups.values():
+            await self._send_group(media)
+        for message, kind in singles:
+            await deliver(self.bot, self.chat_id, message, kind)
+            self.api_calls += 1
+        self.sent += len(batch)
+
+    async def _run(self):
+        outbound_priority.set(PRIORITY_MIRROR)
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                logger.warning(f"Log mirror send failed: {e}\n{traceback.format_exc()}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
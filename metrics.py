@@ -0,0 +1,150 @@
+import asyncio
+import bisect
+import threading
+from typing import Callable, Dict, List, Tuple
+
+# Prometheus text format без внешних зависимостей
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callbacks: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def set_function(self, func: Callable[[], float], *labels: str):
+        # Значение считается в момент запроса /metrics
+        self._callbacks[labels] = func
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        values = dict(self._values)
+        for labels, func in self._callbacks.items():
+            try:
+                values[labels] = func()
+            except Exception:
+                continue
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        self._values: Dict[Tuple[str, ...], list] = {}  # {labels: [bucket_counts, sum, count]}
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted((labels, (list(b), s, c)) for labels, (b, s, c) in self._values.items())
+        for labels, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = _labels(self.labelnames, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ========== Метрики бота ==========
+UPDATES = Counter('tganon_updates_total', 'Updates processed per handler', ('handler',))
+UPDATE_ERRORS = Counter('tganon_update_errors_total', 'Handler exceptions per handler', ('handler',))
+UPDATE_SECONDS = Histogram('tganon_update_seconds', 'End-to-end update processing time', ('event',))
+HANDLER_SECONDS = Histogram('tganon_handler_seconds', 'Handler latency', ('handler',))
+API_SECONDS = Histogram('tganon_bot_api_seconds', 'Bot API call latency', ('method',))
+API_ERRORS = Counter('tganon_bot_api_errors_total', 'Bot API call errors', ('method', 'error'))
+DB_SECONDS = Histogram('tganon_db_query_seconds', 'Database query latency per method', ('method',))
+MEMORY_ITEMS = Gauge('tganon_memory_items', 'Sizes of in-memory structures', ('structure',))
+JOB_RUNS = Counter('tganon_job_runs_total', 'Maintenance job runs', ('job', 'result'))
+JOB_SECONDS = Histogram('tganon_job_seconds', 'Maintenance job run time', ('job',))
+RETENTION_ROWS = Counter('tganon_retention_rows_total', 'Expired rows deleted by the retention engine', ('table',))
+UPDATES_DROPPED = Counter('tganon_updates_dropped_total', 'Updates dropped before reaching a handler', ('reason',))
+FLOOD_DELAY_SECONDS = Histogram('tganon_flood_delay_seconds', 'Time delayed updates waited for a flood-control slot',
+                                ('class',))
+USER_QUEUE_DEPTH = Histogram('tganon_user_queue_depth', 'Per-user update queue depth on arrival',
+                             buckets=(1, 2, 4, 8, 16, 32, 64))
+LOOP_LAG = Gauge('tganon_event_loop_lag_seconds', 'Event loop scheduling lag')
+
+
+async def measure_loop_lag(interval: float = 1.0):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        LOOP_LAG.set(max(0.0, loop.time() - expected))
+
@@ -0,0 +1,378 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Awaitable, Callable, Deque, Dict, Iterable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import CallbackQuery, TelegramObject, Update
+
+import metrics
+from ratelimit import SlidingWindowLimiter
+from tracing import SlowUpdateLog, Trace, current_trace, record_span
+
+logger = logging.getLogger(__name__)
+
+
+# Выставляет UserSequencerMiddleware.lock() для апдейта сверх max_depth
+_queue_overflow: ContextVar[bool] = ContextVar('user_queue_overflow', default=False)
+
+
+def handler_name(data: Dict[str, Any]) -> str:
+    handler = data.get('handler')
+    callback = getattr(handler, 'callback', None)
+    return getattr(callback, '__name__', 'unhandled')
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware: update count and latency per handler."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = handler_name(data)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.handler = name
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            metrics.UPDATE_ERRORS.inc(name)
+            raise
+        finally:
+            metrics.UPDATES.inc(name)
+            metrics.HANDLER_SECONDS.observe(time.perf_counter() - started, name)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Request middleware: Bot API latency and errors per method."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            metrics.API_ERRORS.inc(name, type(e).__name__)
+            raise
+        finally:
+            metrics.API_SECONDS.observe(time.perf_counter() - started, name)
+            record_span('api', name, started)
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Outer update middleware: end-to-end update time and slow-update traces.
+
+    Every update is timed. A sampled share of updates also collects DB and
+    Bot API spans, and those slower than the threshold go to the trace file.
+    """
+
+    def __init__(self, slow_log: SlowUpdateLog):
+        self.slow_log = slow_log
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+        trace = None
+        token = None
+        if self.slow_log.sampled():
+            user = data.get('event_from_user')
+            trace = Trace(event.update_id, event.event_type, user.id if user else None)
+            token = current_trace.set(trace)
+        try:
+            return await handler(event, data)
+        finally:
+            duration = time.perf_counter() - started
+            metrics.UPDATE_SECONDS.observe(duration, event.event_type)
+            if trace is not None:
+                current_trace.reset(token)
+                self.slow_log.write(trace, duration)
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """Outer update middleware: at most `limit` updates processed at once (0 - no limit).
+
+    Counts updates in flight, including those waiting for a slot, so
+    shutdown can `drain()` them before the bot session is closed.
+    """
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit) if limit > 0 else None
+        self.in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        metrics.MEMORY_ITEMS.set_function(lambda: self.in_flight, 'updates_in_flight')
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        self.in_flight += 1
+        self._idle.clear()
+        try:
+            if self._semaphore is None:
+                return await handler(event, data)
+            async with self._semaphore:
+                return await handler(event, data)
+        finally:
+            self.in_flight -= 1
+            if not self.in_flight:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait for updates in flight to finish; False if some are still running after `timeout`."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class UserSequencerMiddleware(BaseEventIsolation, BaseMiddleware):
+    """Per-user FIFO of updates: one user's updates run in arrival order.
+
+    Passed to the Dispatcher as `events_isolation`, so aiogram's
+    FSMContextMiddleware takes the user's lock before it loads the FSM
+    state: a queued update sees the state left by the one before it, and
+    the order is fixed before anything awaits. Each user with updates in
+    flight has a FIFO queue (an asyncio.Lock, whose waiters are woken in
+    order); different users never wait for each other, and a queue is freed
+    as soon as it is empty. A queue deeper than `max_depth` lets the update
+    through without the lock; registered as an outer update middleware as
+    well, this object then drops it. Updates waiting in a queue have not
+    reached ConcurrencyLimitMiddleware yet, so shutdown drains this first.
+    """
+
+    def __init__(self, max_depth: int = 32):
+        self.max_depth = max_depth
+        self._queues: Dict[StorageKey, list] = {}  # {ключ FSM: [depth, lock]}
+        self.queued = 0
+        self.dropped = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        metrics.MEMORY_ITEMS.set_function(lambda: len(self._queues), 'user_queues')
+        metrics.MEMORY_ITEMS.set_function(lambda: self.queued, 'user_queued_updates')
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = [0, asyncio.Lock()]
+        if queue[0] >= self.max_depth:
+            self.dropped += 1
+            metrics.UPDATES_DROPPED.inc('user_queue_full')
+            token = _queue_overflow.set(True)
+            try:
+                yield
+            finally:
+                _queue_overflow.reset(token)
+            return
+        queue[0] += 1
+        self.queued += 1
+        self._idle.clear()
+        metrics.USER_QUEUE_DEPTH.observe(queue[0])
+        try:
+            async with queue[1]:
+                yield
+        finally:
+            queue[0] -= 1
+            self.queued -= 1
+            if not queue[0]:
+                del self._queues[key]
+            if not self.queued:
+                self._idle.set()
+
+    async def close(self) -> None:
+        pass  # очереди освобождаются сами, когда пустеют
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        # Очередь пользователя переполнена: lock() пропустил апдейт без очереди, отбрасываем
+        if _queue_overflow.get():
+            return None
+        return await handler(event, data)
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait for queued and running updates to finish; False if some remain after `timeout`."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class FloodControlMiddleware(BaseMiddleware):
+    """Inner middleware: per-user sliding-window limits per handler class.
+
+    `classes` maps handler names to a class ('search', 'draft', ...);
+    `limits` maps a class to (events, window_seconds). Handlers without a
+    class fall under 'callbacks' for callback queries and 'other' for
+    messages. Over the limit the update is dropped; the user gets one
+    warning per flood episode if `warn` is set.
+
+    Updates of classes in `delayed` (relayed chat messages) are not dropped
+    right away: they go to the user's delay queue and the middleware
+    returns, so no user lock or concurrency slot is held while they wait.
+    A background task runs them in order as window slots free up. A queue
+    holds at most one window's worth of events, all queues together at
+    most `max_delayed`. An update still waiting after `max_delay` seconds
+    is dropped. Any other update from the user discards their queue, so
+    /stop and buttons never wait behind a flood.
+    """
+
+    def __init__(self, limits: Dict[str, tuple], classes: Dict[str, str],
+                 warn: bool = True, max_users: int = 100000,
+                 delayed: Iterable[str] = (), max_delay: float = 30.0, max_delayed: int = 1000):
+        self.classes = classes
+        self.warn = warn
+        self.delayed = frozenset(delayed)
+        self.max_delay = max_delay
+        self.max_delayed = max_delayed
+        self.limiters = {
+            name: SlidingWindowLimiter(events, window, max_keys=max_users)
+            for name, (events, window) in limits.items()
+        }
+        # {user_id: deque[(handler, event, data, class, queued_at)]}
+        self._queues: Dict[int, Deque[tuple]] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self.pending = 0  # отложенные апдейты, включая выполняемый сейчас
+        self._idle = asyncio.Event()
+        self._idle.set()
+        metrics.MEMORY_ITEMS.set_function(lambda: sum(len(l) for l in self.limiters.values()), 'flood_keys')
+        metrics.MEMORY_ITEMS.set_function(lambda: self.pending, 'flood_delayed_updates')
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get('event_from_user')
+        name = self.classes.get(handler_name(data))
+        if name is None:
+            name = 'callbacks' if isinstance(event, CallbackQuery) else 'other'
+        limiter = self.limiters.get(name)
+        if user is None or limiter is None:
+            return await handler(event, data)
+        if name not in self.delayed:
+            # Команда после флуда: отложенные сообщения не должны уйти после неё
+            self._discard(user.id)
+        elif user.id in self._queues:
+            # Уже есть очередь - встаём в конец, иначе нарушится порядок сообщений
+            if self._delay(handler, event, data, name, user.id):
+                return None
+            return await self._drop(event, limiter, user.id, name)
+        if limiter.hit(user.id):
+            return await handler(event, data)
+        if name in self.delayed and self._delay(handler, event, data, name, user.id):
+            return None
+        return await self._drop(event, limiter, user.id, name)
+
+    async def _drop(self, event: TelegramObject, limiter: SlidingWindowLimiter, user_id: int, name: str):
+        metrics.UPDATES_DROPPED.inc(f'flood_{name}')
+        if self.warn and limiter.warn_once(user_id):
+            text = "⏳ Слишком часто. Подождите немного и попробуйте снова."
+            try:
+                await event.answer(text)  # Message - ответ в чат, CallbackQuery - всплывающее уведомление
+            except Exception:
+                pass
+        return None
+
+    def _delay(self, handler, event: TelegramObject, data: Dict[str, Any], name: str, user_id: int) -> bool:
+        queue = self._queues.get(user_id)
+        if self.pending >= self.max_delayed or (queue and len(queue) >= self.limiters[name].limit):
+            return False
+        if queue is None:
+            queue = self._queues[user_id] = deque()
+        queue.append((handler, event, data, name, time.monotonic()))
+        self.pending += 1
+        self._idle.clear()
+        if user_id not in self._workers:
+            self._workers[user_id] = asyncio.create_task(self._run_delayed(user_id, queue))
+        return True
+
+    def _discard(self, user_id: int):
+        # Задача доработает текущий апдейт и выйдет; следующей очереди - новая задача
+        self._workers.pop(user_id, None)
+        queue = self._queues.pop(user_id, None)
+        if queue:
+            metrics.UPDATES_DROPPED.inc('flood_discarded', amount=len(queue))
+            self._done(len(queue))
+            queue.clear()
+
+    def _done(self, count: int = 1):
+        self.pending -= count
+        if not self.pending:
+            self._idle.set()
+
+    async def _run_delayed(self, user_id: int, queue: Deque[tuple]):
+        try:
+            while queue:
+                handler, event, data, name, queued_at = queue[0]
+                limiter = self.limiters[name]
+                if not limiter.hit(user_id):
+                    step = limiter.window / limiter.limit
+                    if time.monotonic() - queued_at + step <= self.max_delay:
+                        await asyncio.sleep(step)
+                        continue
+                    queue.popleft()
+                    self._done()
+                    await self._drop(event, limiter, user_id, name)
+                    continue
+                queue.popleft()
+                metrics.FLOOD_DELAY_SECONDS.observe(time.monotonic() - queued_at, name)
+                try:
+                    await handler(event, data)
+                except Exception as e:
+                    logger.error(f"Delayed {name} update of {user_id} failed: {e}")
+                finally:
+                    self._done()
+        finally:
+            if self._workers.get(user_id) is asyncio.current_task():
+                del self._workers[user_id]
+            if self._queues.get(user_id) is queue and not queue:
+                del self._queues[user_id]
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait for delayed updates to run or expire; False if some remain after `timeout`."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+def parse_flood_limits(spec: str) -> Dict[str, tuple]:
+    """'search=5/10,relay=30/10' -> {'search': (5, 10.0), 'relay': (30, 10.0)}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, rule = item.split('=')
+        events, window = rule.split('/')
+        limits[name.strip()] = (int(events), float(window))
+    return limits
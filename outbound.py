@@ -0,0 +1,149 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+from ratelimit import ChatRateLimiter, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Классы приоритета: меньше - важнее
+PRIORITY_RELAY = 0      # живой чат и ответы пользователю
+PRIORITY_MIRROR = 1     # копии в лог-чат
+PRIORITY_BROADCAST = 2  # рассылки
+PRIORITY_NAMES = {PRIORITY_RELAY: 'relay', PRIORITY_MIRROR: 'mirror', PRIORITY_BROADCAST: 'broadcast'}
+
+# Приоритет задаётся для текущей задачи: outbound_priority.set(PRIORITY_BROADCAST)
+outbound_priority: contextvars.ContextVar[int] = contextvars.ContextVar('outbound_priority', default=PRIORITY_RELAY)
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    """Request middleware that schedules every Bot API call sent to a chat.
+
+    Each call first waits for its chat's bucket (1 msg/s for private chats,
+    20 msg/min for groups), then for a slot in the global bucket; global
+    slots are handed out in priority order. TelegramRetryAfter pauses the
+    chat's bucket and the call is retried. A 429 is usually about one chat
+    (a group's 20 msg/min), so the global bucket is paused only when 429s
+    come from `flood_chats` different chats within `flood_window` seconds.
+    """
+
+    def __init__(self, global_rate: float = 30.0, chat_rate: float = 1.0, chat_burst: float = 3.0,
+                 group_rate: float = 20 / 60, max_retries: int = 3,
+                 flood_window: float = 10.0, flood_chats: int = 3):
+        self.global_bucket = TokenBucket(global_rate)
+        self.private_chats = ChatRateLimiter(rate=chat_rate, capacity=chat_burst)
+        self.group_chats = ChatRateLimiter(rate=group_rate, capacity=chat_burst)
+        self.max_retries = max_retries
+        self.flood_window = flood_window
+        self.flood_chats = flood_chats
+        self._recent_429: Dict[object, float] = {}  # {chat_id: время последнего 429}
+        self._waiters: List[tuple] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        # Метрики
+        self.sent: Dict[int, int] = {p: 0 for p in PRIORITY_NAMES}
+        self.wait_total: Dict[int, float] = {p: 0.0 for p in PRIORITY_NAMES}
+        self.wait_max: Dict[int, float] = {p: 0.0 for p in PRIORITY_NAMES}
+        self.retry_after = 0
+
+    def install(self, bot: Bot):
+        bot.session.middleware(self)
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        try:
+            is_group = int(chat_id) < 0
+        except (TypeError, ValueError):
+            is_group = True  # @channelusername
+        limiter = self.group_chats if is_group else self.private_chats
+        return limiter.bucket(chat_id)
+
+    async def _dispatch(self):
+        while True:
+            while not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            await self.global_bucket.acquire()
+            while self._waiters:
+                _, _, future = heapq.heappop(self._waiters)
+                if not future.done():
+                    future.set_result(None)
+                    break
+
+    async def _acquire_global(self, priority: int):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._wakeup.set()
+        await future
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None:
+            # getUpdates, answerCallbackQuery и т.п. не ограничиваем
+            return await make_request(bot, method)
+
+        priority = outbound_priority.get()
+        chat_bucket = self._chat_bucket(chat_id)
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            await chat_bucket.acquire()
+            await self._acquire_global(priority)
+            waited = time.monotonic() - started
+            self.sent[priority] += 1
+            self.wait_total[priority] += waited
+            self.wait_max[priority] = max(self.wait_max[priority], waited)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.retry_after += 1
+                if attempt == self.max_retries:
+                    raise
+                chat_bucket.pause(e.retry_after)
+                if self._bot_wide_flood(chat_id):
+                    logger.warning(f"Flood control in several chats: all sends paused for {e.retry_after}s")
+                    self.global_bucket.pause(e.retry_after)
+                else:
+                    logger.warning(f"Flood control for chat {chat_id}: paused for {e.retry_after}s")
+
+    def _bot_wide_flood(self, chat_id) -> bool:
+        # 429 сразу из нескольких чатов - лимит бота целиком, а не одного чата
+        now = time.monotonic()
+        self._recent_429[chat_id] = now
+        for key, ts in list(self._recent_429.items()):
+            if now - ts > self.flood_window:
+                del self._recent_429[key]
+        return len(self._recent_429) >= self.flood_chats
+
+    def queue_depth(self) -> Dict[str, int]:
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                depth[PRIORITY_NAMES[priority]] += 1
+        return depth
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                'sent': self.sent[p],
+                'avg_wait_ms': self.wait_total[p] / self.sent[p] * 1000 if self.sent[p] else 0.0,
+                'max_wait_ms': self.wait_max[p] * 1000,
+            }
+            for p, name in PRIORITY_NAMES.items()
+        }
@@ -0,0 +1,93 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ACTIVITY_RESOLUTION = 3600  # секунд; точность chats.last_activity
+
+
+class PartnerMap:
+    """Bidirectional {user_id: partner_id} map of active chats.
+
+    Warmed from the `chats` table and kept up to date by Database.create_chat
+    and Database.end_chat, so partner lookups never reach SQLite. Also
+    remembers when each chat's activity was last written to the table, so
+    relayed messages update chats.last_activity at most once per
+    `ACTIVITY_RESOLUTION` seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._partner: Dict[int, int] = {}
+        self._touched: Dict[int, float] = {}  # {меньший user_id пары: время записи активности}
+        self.hits = 0    # пользователь найден в чате
+        self.misses = 0  # пользователь не в чате
+
+    def __len__(self) -> int:
+        return len(self._partner) // 2
+
+    def get(self, user_id: int) -> Optional[int]:
+        partner_id = self._partner.get(user_id)
+        if partner_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return partner_id
+
+    def link(self, user1_id: int, user2_id: int):
+        with self._lock:
+            self._partner[user1_id] = user2_id
+            self._partner[user2_id] = user1_id
+            self._touched[min(user1_id, user2_id)] = time.time()
+
+    def try_link(self, user1_id: int, user2_id: int) -> bool:
+        # Атомарно: проверка, что оба свободны, и резерв пары до первого await обработчика
+        with self._lock:
+            if user1_id in self._partner or user2_id in self._partner:
+                return False
+            self._partner[user1_id] = user2_id
+            self._partner[user2_id] = user1_id
+            return True
+
+    def unlink(self, user_id: int) -> Optional[int]:
+        with self._lock:
+            partner_id = self._partner.pop(user_id, None)
+            if partner_id is not None and self._partner.get(partner_id) == user_id:
+                del self._partner[partner_id]
+                self._touched.pop(min(user_id, partner_id), None)
+            return partner_id
+
+    def touch(self, user_id: int, partner_id: int, now: float,
+              resolution: float = ACTIVITY_RESOLUTION) -> bool:
+        """True if the pair's activity is due to be written to the table."""
+        key = min(user_id, partner_id)
+        with self._lock:
+            if now - self._touched.get(key, 0) < resolution:
+                return False
+            self._touched[key] = now
+            return True
+
+    def load(self, pairs: Iterable[Tuple[int, int]]):
+        with self._lock:
+            self._partner.clear()
+            for user1_id, user2_id in pairs:
+                self._partner[user1_id] = user2_id
+                self._partner[user2_id] = user1_id
+            # Перезагрузка (MySQL - раз в refresh_seconds) не сбрасывает отметки живых чатов
+            self._touched = {key: ts for key, ts in self._touched.items() if key in self._partner}
+
+    def diff(self, pairs: Iterable[Tuple[int, int]]) -> List[Tuple[int, Optional[int], Optional[int]]]:
+        """(user_id, in_map, in_db) for every user whose partner differs from `pairs`."""
+        expected: Dict[int, int] = {}
+        for user1_id, user2_id in pairs:
+            expected[user1_id] = user2_id
+            expected[user2_id] = user1_id
+        with self._lock:
+            current = dict(self._partner)
+        return [
+            (uid, current.get(uid), expected.get(uid))
+            for uid in current.keys() | expected.keys()
+            if current.get(uid) != expected.get(uid)
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        return {'chats': len(self), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds: float):
+        # Telegram прислал retry_after - никто не отправляет до истечения паузы
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: float = 1.0):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class ChatRateLimiter:
+    """Per-chat token buckets (Telegram: about 1 message per second per chat).
+
+    Buckets of chats that were not used recently are dropped once there are
+    more than `max_chats` of them, so memory stays bounded.
+    """
+
+    def __init__(self, rate: float = 1.0, capacity: float = 3.0, max_chats: int = 10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_chats = max_chats
+        self.buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+
+    def bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.buckets[chat_id] = TokenBucket(self.rate, self.capacity)
+            while len(self.buckets) > self.max_chats:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(chat_id)
+        return bucket
+
+    async def acquire(self, chat_id: int):
+        await self.bucket(chat_id).acquire()
+
+
+class SlidingWindowLimiter:
+    """At most `limit` events per `window` seconds per key (sliding window).
+
+    Approximated from the counts of the current and previous fixed windows,
+    so each key costs a few numbers. Keys not seen recently are dropped
+    once there are more than `max_keys` of them.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int = 100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        # {key: [window_start, current_count, previous_count, warned]}
+        self.keys: "OrderedDict[Hashable, list]" = OrderedDict()
+
+    def hit(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """Count an event for `key`; False if it is over the limit (and is not counted)."""
+        now = now if now is not None else time.monotonic()
+        state = self.keys.get(key)
+        if state is None:
+            state = self.keys[key] = [now - now % self.window, 0, 0, False]
+            while len(self.keys) > self.max_keys:
+                self.keys.popitem(last=False)
+        else:
+            self.keys.move_to_end(key)
+        elapsed_windows = int((now - state[0]) // self.window)
+        if elapsed_windows:
+            state[2] = state[1] if elapsed_windows == 1 else 0
+            state[1] = 0
+            state[0] += elapsed_windows * self.window
+        weight = 1 - (now - state[0]) / self.window
+        if state[2] * weight + state[1] >= self.limit:
+            return False
+        state[1] += 1
+        state[3] = False
+        return True
+
+    def warn_once(self, key: Hashable) -> bool:
+        # True только для первого отказа подряд - одно предупреждение на приступ флуда
+        state = self.keys.get(key)
+        if state is None or state[3]:
+            return False
+        state[3] = True
+        return True
+
+    def __len__(self) -> int:
+        return len(self.keys)
@@ -0,0 +1,55 @@
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.types import Message
+
+# Порядок важен: у фото/видео может быть caption, но не text
+CONTENT_TYPES = ('text', 'photo', 'video', 'audio', 'voice', 'video_note', 'document', 'sticker')
+
+
+def content_type(message: Message) -> Optional[str]:
+    for kind in CONTENT_TYPES:
+        if getattr(message, kind, None):
+            return kind
+    return None
+
+
+async def deliver(bot: Bot, chat_id, message: Message, kind: str, caption: Optional[str] = None):
+    """Send the content of `message` to `chat_id` with the matching send_* method."""
+    if kind == 'text':
+        return await bot.send_message(chat_id, caption if caption is not None else message.text)
+    if kind == 'photo':
+        return await bot.send_photo(chat_id, message.photo[-1].file_id, caption=caption)
+    if kind == 'video':
+        return await bot.send_video(chat_id, message.video.file_id, caption=caption)
+    if kind == 'audio':
+        return await bot.send_audio(chat_id, message.audio.file_id, caption=caption)
+    if kind == 'voice':
+        return await bot.send_voice(chat_id, message.voice.file_id)
+    if kind == 'video_note':
+        return await bot.send_video_note(chat_id, message.video_note.file_id)
+    if kind == 'document':
+        return await bot.send_document(chat_id, message.document.file_id, caption=caption)
+    if kind == 'sticker':
+        return await bot.send_sticker(chat_id, message.sticker.file_id)
+    return None
+
+
+class LatencyStats:
+    """Count / average / max latency per content type."""
+
+    def __init__(self):
+        self._stats: Dict[str, list] = {}  # {kind: [count, total_seconds, max_seconds]}
+
+    def record(self, kind: str, seconds: float):
+        entry = self._stats.setdefault(kind, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            kind: {'count': count, 'avg_ms': total / count * 1000, 'max_ms': worst * 1000}
+            for kind, (count, total, worst) in self._stats.items()
+        }
+
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import metrics
+from database import AsyncDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionEngine:
+    """Deletes expired rows in small indexed batches.
+
+    Each batch is its own short transaction, so the SQLite write lock is
+    released between batches, and the engine sleeps for `pause` so relay
+    queries queued on the DB thread run in between. A retention of 0
+    turns cleanup of that table off.
+
+    Chats are not deleted by age: a chat is ended once its last_activity is
+    older than the retention, through `end_chat(user1_id, user2_id)` so both
+    users are notified and their states cleared. `end_chat` returns whether
+    the chat was ended, and only ended chats count towards the batch: a
+    failing database stops the run instead of looping over the same rows.
+    """
+
+    def __init__(self, db: AsyncDatabase, posts: int, chats: int, mirror: int,
+                 batch: int = 500, pause: float = 0.05,
+                 end_chat: Optional[Callable[[int, int], Awaitable[bool]]] = None):
+        self.db = db
+        self.batch = batch
+        self.pause = pause
+        self.end_chat = end_chat or self._end_chat
+        self.policies = [
+            ('posts', posts, db.delete_posts_batch),
+            ('chats', chats, self._end_idle_chats),
+            ('message_mirror', mirror, db.delete_mirror_batch),
+        ]
+        self.last_report: Dict[str, Dict[str, Any]] = {}
+
+    async def _end_chat(self, user1_id: int, user2_id: int) -> bool:
+        await self.db.end_chat(user1_id)
+        return True
+
+    async def _end_idle_chats(self, cutoff: int, limit: int) -> int:
+        pairs = await self.db.get_idle_chats(cutoff, limit)
+        ended = 0
+        for user1_id, user2_id in pairs:
+            if await self.end_chat(user1_id, user2_id):
+                ended += 1
+        if ended < len(pairs):
+            logger.warning(f"Retention: {len(pairs) - ended} of {len(pairs)} idle chats could not be ended")
+        # Неполная пачка останавливает _purge: незавершённые чаты - до следующего запуска
+        return ended
+
+    async def _purge(self, delete_batch, cutoff: int) -> Dict[str, Any]:
+        started = time.perf_counter()
+        rows = batches = 0
+        while True:
+            deleted = await delete_batch(cutoff, self.batch)
+            rows += deleted
+            batches += 1
+            if deleted < self.batch:
+                break
+            await asyncio.sleep(self.pause)
+        return {'rows': rows, 'batches': batches, 'seconds': round(time.perf_counter() - started, 3)}
+
+    async def run(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        now = int(time.time())
+        for table, retention, delete_batch in self.policies:
+            if retention <= 0:
+                continue
+            report[table] = await self._purge(delete_batch, now - retention)
+            metrics.RETENTION_ROWS.inc(table, amount=report[table]['rows'])
+        self.last_report = report
+        return report
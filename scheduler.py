@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+async def chunked(step: Callable[[], bool], budget: float = 0.01) -> int:
+    """Call `step()` until it returns False, yielding to the event loop every `budget` seconds.
+
+    Returns the number of steps made.
+    """
+    steps = 0
+    deadline = time.perf_counter() + budget
+    while True:
+        more = step()
+        steps += 1
+        if not more:
+            return steps
+        if time.perf_counter() >= deadline:
+            await asyncio.sleep(0)
+            deadline = time.perf_counter() + budget
+
+
+class Job:
+    __slots__ = ('name', 'func', 'interval', 'jitter', 'runs', 'failures', 'last_started',
+                 'last_duration', 'last_error', 'next_run', 'running', 'restarts')
+
+    def __init__(self, name: str, func: Callable[[], Awaitable[Any]], interval: float, jitter: float):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.runs = 0
+        self.failures = 0
+        self.restarts = 0
+        self.last_started: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.next_run: Optional[float] = None
+        self.running = False
+
+    def delay(self) -> float:
+        spread = self.interval * self.jitter
+        return max(0.0, self.interval + random.uniform(-spread, spread))
+
+
+class Scheduler:
+    """Periodic maintenance jobs in the bot's event loop.
+
+    Intervals are jittered and first runs are spread over one interval, so
+    jobs do not wake up together. An exception fails only that run; a job
+    loop that dies anyway is restarted. Runs are timed into metrics.
+    """
+
+    def __init__(self, failure_backoff: float = 30.0):
+        self.failure_backoff = failure_backoff
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+
+    def add(self, name: str, func: Callable[[], Awaitable[Any]], interval: float, jitter: float = 0.1):
+        self.jobs[name] = Job(name, func, interval, jitter)
+
+    def start(self):
+        self._stopping = False
+        for job in self.jobs.values():
+            self._spawn(job, first_delay=random.uniform(0, job.interval))
+
+    def _spawn(self, job: Job, first_delay: float):
+        task = asyncio.create_task(self._loop(job, first_delay), name=f"job:{job.name}")
+        task.add_done_callback(lambda t, job=job: self._on_done(job, t))
+        self._tasks[job.name] = task
+
+    def _on_done(self, job: Job, task: asyncio.Task):
+        if self._stopping or task.cancelled():
+            return
+        error = task.exception()
+        logger.error(f"Job {job.name} loop died: {error!r}, restarting")
+        job.restarts += 1
+        self._spawn(job, first_delay=self.failure_backoff)
+
+    async def _loop(self, job: Job, first_delay: float):
+        delay = first_delay
+        while True:
+            job.next_run = time.time() + delay
+            await asyncio.sleep(delay)
+            ok = await self.run_once(job)
+            delay = job.delay() if ok else min(job.interval, self.failure_backoff)
+
+    async def run_once(self, job: Job) -> bool:
+        job.running = True
+        job.last_started = time.time()
+        started = time.perf_counter()
+        try:
+            await job.func()
+            job.last_error = None
+            return True
+        except Exception as e:
+            job.failures += 1
+            job.last_error = f"{type(e).__name__}: {e}"
+            logger.exception(f"Job {job.name} failed")
+            return False
+        finally:
+            job.running = False
+            job.runs += 1
+            job.last_duration = time.perf_counter() - started
+            metrics.JOB_RUNS.inc(job.name, 'error' if job.last_error else 'ok')
+            metrics.JOB_SECONDS.observe(job.last_duration, job.name)
+
+    async def stop(self):
+        self._stopping = True
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        return [{
+            'name': job.name,
+            'interval': job.interval,
+            'runs': job.runs,
+            'failures': job.failures,
+            'restarts': job.restarts,
+            'running': job.running,
+            'last_ms': round(job.last_duration * 1000, 1) if job.last_duration is not None else None,
+            'next_in': max(0, round(job.next_run - now)) if job.next_run is not None else None,
+            'last_error': job.last_error,
+        } for job in self.jobs.values()]
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+
+class SlidingCounter:
+    """Events in the last `window` seconds, kept in `buckets` time buckets.
+
+    add() and total() are amortized O(1): old buckets are dropped from the
+    left and a running total is maintained.
+    """
+
+    def __init__(self, window: float, buckets: int = 60):
+        self.window = window
+        self.width = window / buckets
+        self.buckets = buckets
+        self._deque: deque = deque()  # [(bucket_id, count)]
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        oldest = int(now // self.width) - self.buckets
+        while self._deque and self._deque[0][0] <= oldest:
+            self._total -= self._deque.popleft()[1]
+
+    def add(self, count: int = 1, ts: Optional[float] = None):
+        now = time.time()
+        ts = now if ts is None else ts
+        bucket_id = int(ts // self.width)
+        with self._lock:
+            self._expire(now)
+            if bucket_id <= int(now // self.width) - self.buckets:
+                return
+            # Прогрев передаёт ts по возрастанию; запоздавшее событие учитываем в последнем бакете
+            if self._deque and self._deque[-1][0] >= bucket_id:
+                last_id, last_count = self._deque[-1]
+                self._deque[-1] = (last_id, last_count + count)
+            else:
+                self._deque.append((bucket_id, count))
+            self._total += count
+
+    def total(self) -> int:
+        with self._lock:
+            self._expire(time.time())
+            return self._total
+
+    def clear(self):
+        with self._lock:
+            self._deque.clear()
+            self._total = 0
+
+
+class ActiveSet:
+    """Users seen in the last `window` seconds; len() is amortized O(1)."""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._seen: "OrderedDict[int, float]" = OrderedDict()
+
+    def touch(self, user_id: int):
+        self._seen[user_id] = time.time()
+        self._seen.move_to_end(user_id)
+
+    def discard(self, user_id: int):
+        self._seen.pop(user_id, None)
+
+    def __len__(self) -> int:
+        cutoff = time.time() - self.window
+        while self._seen:
+            user_id, ts = next(iter(self._seen.items()))
+            if ts > cutoff:
+                break
+            self._seen.popitem(last=False)
+        return len(self._seen)
+
+
+class LiveStats:
+    """Counters behind /stats.
+
+    `users` is incremented by Database.add_user, chats and live posts are
+    read from the partner map and the feed index, the sliding counters are
+    fed by add_post and the handlers. Database.reconcile_stats() fixes drift
+    with COUNT(*) queries and rebuilds posts_24h from the posts table.
+    """
+
+    def __init__(self, search_window: float = 300):
+        self.users = 0
+        self.posts_24h = SlidingCounter(24 * 3600, buckets=1440)
+        self.relayed = SlidingCounter(60, buckets=60)
+        self.searching = ActiveSet(search_window)
+        self.reconciled_at = 0.0
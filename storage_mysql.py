@@ -1,12 +1,27 @@
 import aiomysql
+import copy
 import json
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 from aiogram.fsm.storage.base import BaseStorage, StorageKey, StateType
 from urllib.parse import urlparse
 import os
 
 class MySQLStorage(BaseStorage):
-    def __init__(self):
-        db_url = os.getenv("DATABASE_URL1")
+    """aiogram FSM storage in MySQL with an in-process LRU cache of rows.
+
+    Writes are single upserts and update the cached row (write-through), so
+    state checks on every relayed message are answered from memory. The
+    cache is per process and off by default (FSM_CACHE_SIZE=0): several
+    bot instances share the table, and a cached row would miss another
+    instance's writes. Enable it only for a single instance. Cached data is
+    copied in and out, so callers never mutate the cached row.
+    """
+
+    def __init__(self, cache_size: Optional[int] = None,
+                 pool_minsize: Optional[int] = None, pool_maxsize: Optional[int] = None,
+                 url: Optional[str] = None):
+        db_url = url or os.getenv("DATABASE_URL1")
         if not db_url:
             raise ValueError("DATABASE_URL1 is not set")
         parsed = urlparse(db_url)
@@ -16,6 +31,14 @@ class MySQLStorage(BaseStorage):
         self.port = parsed.port or 3306
         self.db = parsed.path.lstrip("/")
         self.pool = None
+        self.pool_minsize = pool_minsize if pool_minsize is not None else int(os.getenv("FSM_POOL_MIN", "1"))
+        self.pool_maxsize = pool_maxsize if pool_maxsize is not None else int(os.getenv("FSM_POOL_MAX", "10"))
+        self.cache_size = cache_size if cache_size is not None else int(os.getenv("FSM_CACHE_SIZE", "0"))
+        # {(bot_id, user_id, chat_id): (state, data)}
+        self._cache: "OrderedDict[Tuple[int, int, int], Tuple[Optional[str], Dict[str, Any]]]" = OrderedDict()
+        self._writes = 0  # номер последней записи; чтение, пересёкшееся с записью, не кэшируется
+        self.hits = 0
+        self.misses = 0
 
     async def connect(self):
         self.pool = await aiomysql.create_pool(
@@ -24,6 +47,8 @@ class MySQLStorage(BaseStorage):
             password=self.password,
             db=self.db,
             port=self.port,
+            minsize=self.pool_minsize,
+            maxsize=self.pool_maxsize,
             autocommit=True
         )
         async with self.pool.acquire() as conn:
@@ -44,9 +69,57 @@ class MySQLStorage(BaseStorage):
             self.pool.close()
             await self.pool.wait_closed()
 
+    # ---------------- Cache ----------------
+    @staticmethod
+    def _key(key: StorageKey) -> Tuple[int, int, int]:
+        return key.bot_id, key.user_id, key.chat_id
+
+    def _remember(self, cache_key: Tuple[int, int, int], state: Optional[str], data: Dict[str, Any]):
+        if self.cache_size <= 0:
+            return
+        self._cache[cache_key] = (state, data)
+        self._cache.move_to_end(cache_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _load(self, key: StorageKey) -> Tuple[Optional[str], Dict[str, Any]]:
+        # Состояние и данные одной строкой, один запрос на промах кэша
+        cache_key = self._key(key)
+        row = self._cache.get(cache_key)
+        if row is not None:
+            self._cache.move_to_end(cache_key)
+            self.hits += 1
+            return row
+        self.misses += 1
+        writes = self._writes
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(
+                    "SELECT state, data FROM fsm_storage WHERE bot_id=%s AND user_id=%s AND chat_id=%s",
+                    (key.bot_id, key.user_id, key.chat_id)
+                )
+                fetched = await cur.fetchone()
+        state = fetched["state"] if fetched else None
+        data = json.loads(fetched["data"]) if fetched and fetched["data"] else {}
+        if writes == self._writes:
+            self._remember(cache_key, state, data)
+        return state, data
+
+    def _written(self, key: StorageKey, **fields):
+        # Write-through: обновляем строку в кэше, если она там есть
+        self._writes += 1
+        cache_key = self._key(key)
+        cached = self._cache.get(cache_key)
+        if cached is None:
+            return
+        self._cache[cache_key] = (fields.get("state", cached[0]), fields.get("data", cached[1]))
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {'size': len(self._cache), 'hits': self.hits, 'misses': self.misses}
+
     # ---------------- State ----------------
     async def set_state(self, key: StorageKey, state: StateType = None):
-        state_str = state.state if state else None
+        state_str = state.state if hasattr(state, "state") else state
         async with self.pool.acquire() as conn:
             async with conn.cursor() as cur:
                 await cur.execute("""
@@ -54,38 +127,28 @@ class MySQLStorage(BaseStorage):
                     VALUES (%s, %s, %s, %s, %s)
                     ON DUPLICATE KEY UPDATE state=VALUES(state)
                 """, (key.bot_id, key.user_id, key.chat_id, state_str, "{}"))
+        self._written(key, state=state_str)
 
     async def get_state(self, key: StorageKey):
-        async with self.pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute(
-                    "SELECT state FROM fsm_storage WHERE bot_id=%s AND user_id=%s AND chat_id=%s",
-                    (key.bot_id, key.user_id, key.chat_id)
-                )
-                row = await cur.fetchone()
-                return row["state"] if row else None
+        state, _ = await self._load(key)
+        return state
 
     # ---------------- Data ----------------
     async def set_data(self, key: StorageKey, data: dict):
+        # Один upsert: state существующей строки не трогаем, у новой он NULL
+        data = copy.deepcopy(dict(data))
         async with self.pool.acquire() as conn:
             async with conn.cursor() as cur:
-                # Получаем текущее состояние, чтобы не затирать state
-                state = await self.get_state(key)
                 await cur.execute("""
                     INSERT INTO fsm_storage (bot_id, user_id, chat_id, state, data)
-                    VALUES (%s, %s, %s, %s, %s)
+                    VALUES (%s, %s, %s, NULL, %s)
                     ON DUPLICATE KEY UPDATE data=VALUES(data)
-                """, (key.bot_id, key.user_id, key.chat_id, state, json.dumps(data)))
+                """, (key.bot_id, key.user_id, key.chat_id, json.dumps(data)))
+        self._written(key, data=data)
 
     async def get_data(self, key: StorageKey):
-        async with self.pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute(
-                    "SELECT data FROM fsm_storage WHERE bot_id=%s AND user_id=%s AND chat_id=%s",
-                    (key.bot_id, key.user_id, key.chat_id)
-                )
-                row = await cur.fetchone()
-                return json.loads(row["data"]) if row and row["data"] else {}
+        _, data = await self._load(key)
+        return copy.deepcopy(data)
 
     # ---------------- Clear ----------------
     async def clear(self, key: StorageKey):
@@ -95,3 +158,5 @@ class MySQLStorage(BaseStorage):
                     "DELETE FROM fsm_storage WHERE bot_id=%s AND user_id=%s AND chat_id=%s",
                     (key.bot_id, key.user_id, key.chat_id)
                 )
+        self._writes += 1
+        self._remember(self._key(key), None, {})
@@ -0,0 +1,248 @@
+import heapq
+import time
+from array import array
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class InteractionStore:
+    """Who talked to whom recently; every pair expires on its own.
+
+    `seen()` is an O(1) dict lookup. Expiry times also go into a min-heap,
+    so `expire()` only touches entries that are actually due; entries
+    refreshed by a later `add()` are skipped lazily.
+    """
+
+    def __init__(self, ttl: float = 3 * 3600):
+        self.ttl = ttl
+        self._pairs: Dict[int, Dict[int, float]] = {}  # {user_id: {other_id: expires_at}}
+        self._heap: List[Tuple[float, int, int]] = []
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def users(self) -> int:
+        return len(self._pairs)
+
+    def _set(self, user_id: int, other_id: int, expires_at: float):
+        partners = self._pairs.setdefault(user_id, {})
+        if other_id not in partners:
+            self._count += 1
+        partners[other_id] = expires_at
+
+    def add(self, user1_id: int, user2_id: int, expires_at: Optional[float] = None) -> float:
+        now = time.time()
+        expires_at = expires_at if expires_at is not None else now + self.ttl
+        if expires_at <= now:
+            return expires_at
+        self._set(user1_id, user2_id, expires_at)
+        self._set(user2_id, user1_id, expires_at)
+        heapq.heappush(self._heap, (expires_at, min(user1_id, user2_id), max(user1_id, user2_id)))
+        self.expire(now, budget=8)
+        return expires_at
+
+    def load(self, rows: Iterable[Tuple[int, int, float]]):
+        for user1_id, user2_id, expires_at in rows:
+            self.add(user1_id, user2_id, expires_at)
+
+    def seen(self, user_id: int, other_id: int, now: Optional[float] = None) -> bool:
+        expires_at = self._pairs.get(user_id, {}).get(other_id)
+        if expires_at is None:
+            return False
+        return expires_at > (now if now is not None else time.time())
+
+    def _remove(self, user_id: int, other_id: int, expires_at: float):
+        partners = self._pairs.get(user_id)
+        if partners is None or partners.get(other_id) != expires_at:
+            return  # пара была обновлена позже - в куче есть более свежая запись
+        del partners[other_id]
+        self._count -= 1
+        if not partners:
+            del self._pairs[user_id]
+
+    def expire(self, now: Optional[float] = None, budget: Optional[int] = None) -> int:
+        """Drop due pairs; `budget` limits heap pops per call. Returns pops done."""
+        now = now if now is not None else time.time()
+        popped = 0
+        while self._heap and self._heap[0][0] <= now and (budget is None or popped < budget):
+            expires_at, user1_id, user2_id = heapq.heappop(self._heap)
+            self._remove(user1_id, user2_id, expires_at)
+            self._remove(user2_id, user1_id, expires_at)
+            popped += 1
+        return popped
+
+
+class PostViewStore:
+    """Post view cooldowns: may `viewer` be shown `owner`'s post again?
+
+    Each viewer has two packed arrays, owner ids (int64) and view times
+    (uint32 seconds), so a view costs about 12 bytes instead of a dict
+    entry with a float. Lookups use array.index, which runs in C.
+    Only views younger than `cooldown` matter: a viewer's arrays are
+    compacted when they grow, and viewers with no fresh views are dropped
+    through a timing wheel, so `expire()` only visits viewers from buckets
+    that have become older than the cooldown.
+    """
+
+    def __init__(self, cooldown: int = 600, wheel_buckets: int = 60, compact_at: int = 64):
+        self.cooldown = cooldown
+        self.width = max(1, cooldown // wheel_buckets)
+        self.compact_at = compact_at
+        self._views: Dict[int, Tuple[array, array]] = {}  # {viewer_id: (owners, times)}
+        self._wheel: deque = deque()  # [(bucket_id, array of viewer_ids)]
+        self._entries = 0
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def viewers(self) -> int:
+        return len(self._views)
+
+    def record(self, viewer_id: int, owner_id: int, now: Optional[float] = None):
+        now = int(now if now is not None else time.time())
+        bucket_id = now // self.width
+        views = self._views.get(viewer_id)
+        if views is None:
+            views = self._views[viewer_id] = (array('q'), array('I'))
+            last_bucket = None
+        else:
+            if len(views[0]) >= self.compact_at and views[1][0] <= now - self.cooldown:
+                self._compact(views, now)
+            last_bucket = views[1][-1] // self.width if views[1] else None
+        views[0].append(owner_id)
+        views[1].append(now)
+        self._entries += 1
+
+        # В колесо зрителя кладём один раз на бакет
+        if last_bucket == bucket_id:
+            return
+        if self._wheel and self._wheel[-1][0] == bucket_id:
+            self._wheel[-1][1].append(viewer_id)
+        else:
+            self._wheel.append((bucket_id, array('q', [viewer_id])))
+
+    def _compact(self, views: Tuple[array, array], now: int):
+        owners, times = views
+        cutoff = now - self.cooldown
+        keep = [i for i in range(len(times)) if times[i] > cutoff]
+        self._entries -= len(times) - len(keep)
+        owners[:] = array('q', [owners[i] for i in keep])
+        times[:] = array('I', [times[i] for i in keep])
+
+    def can_show(self, viewer_id: int, owner_id: int, now: Optional[float] = None) -> bool:
+        views = self._views.get(viewer_id)
+        if views is None:
+            return True
+        owners, times = views
+        cutoff = (now if now is not None else time.time()) - self.cooldown
+        index = -1
+        try:
+            while True:
+                index = owners.index(owner_id, index + 1)
+                if times[index] > cutoff:
+                    return False
+        except ValueError:
+            return True
+
+    def expire(self, now: Optional[float] = None, budget: Optional[int] = None) -> int:
+        """Drop viewers whose newest view is older than the cooldown; returns viewers visited."""
+        now = now if now is not None else time.time()
+        cutoff = now - self.cooldown
+        visited = 0
+        while self._wheel and (self._wheel[0][0] + 1) * self.width <= cutoff:
+            viewer_ids = self._wheel[0][1]
+            while viewer_ids:
+                if budget is not None and visited >= budget:
+                    return visited
+                viewer_id = viewer_ids.pop()
+                visited += 1
+                views = self._views.get(viewer_id)
+                if views is not None and views[1][-1] <= cutoff:
+                    self._entries -= len(views[1])
+                    del self._views[viewer_id]
+            self._wheel.popleft()
+        return visited
+
+
+class DraftStore:
+    """Unpublished post drafts: LRU with a capacity cap and a TTL.
+
+    get/put/pop are O(1). put() returns the entries evicted by the capacity
+    cap so the caller can spill them to SQLite; expired drafts are dropped.
+    """
+
+    def __init__(self, capacity: int = 10000, ttl: float = 24 * 3600):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._drafts: "OrderedDict[int, Tuple[str, float]]" = OrderedDict()  # {user_id: (text, created)}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._drafts)
+
+    def put(self, user_id: int, text: str, created: Optional[float] = None) -> List[Tuple[int, str, float]]:
+        self._drafts[user_id] = (text, created if created is not None else time.time())
+        self._drafts.move_to_end(user_id)
+        evicted = []
+        while len(self._drafts) > self.capacity:
+            evicted_id, (evicted_text, evicted_created) = self._drafts.popitem(last=False)
+            evicted.append((evicted_id, evicted_text, evicted_created))
+            self.evictions += 1
+        return evicted
+
+    def _fresh(self, user_id: int) -> Optional[Tuple[str, float]]:
+        entry = self._drafts.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[1] <= time.time() - self.ttl:
+            del self._drafts[user_id]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def get(self, user_id: int) -> Optional[str]:
+        entry = self._fresh(user_id)
+        if entry is None:
+            return None
+        self._drafts.move_to_end(user_id)
+        return entry[0]
+
+    def pop(self, user_id: int) -> Optional[str]:
+        entry = self._fresh(user_id)
+        if entry is None:
+            return None
+        del self._drafts[user_id]
+        return entry[0]
+
+    def expire(self, budget: Optional[int] = None) -> int:
+        # Самые давно использованные лежат в начале OrderedDict; просроченный
+        # черновик, прочитанный недавно, останется до следующего обращения (_fresh)
+        cutoff = time.time() - self.ttl
+        removed = 0
+        while self._drafts and (budget is None or removed < budget):
+            user_id, (_, created) = next(iter(self._drafts.items()))
+            if created > cutoff:
+                break
+            del self._drafts[user_id]
+            removed += 1
+        self.expirations += removed
+        return removed
+
+    def items(self) -> List[Tuple[int, str, float]]:
+        return [(user_id, text, created) for user_id, (text, created) in self._drafts.items()]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'size': len(self._drafts),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
@@ -0,0 +1,87 @@
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Trace:
+    """Spans (DB queries, Bot API calls) collected while one update is processed."""
+
+    __slots__ = ('update_id', 'event', 'user_id', 'handler', 'started', 'spans')
+
+    def __init__(self, update_id: int, event: str, user_id: Optional[int]):
+        self.update_id = update_id
+        self.event = event
+        self.user_id = user_id
+        self.handler: Optional[str] = None
+        self.started = time.perf_counter()
+        self.spans: List[list] = []  # [kind, name, start_ms, duration_ms]
+
+    def add_span(self, kind: str, name: str, started: float, duration: float):
+        self.spans.append([kind, name, round((started - self.started) * 1000, 3), round(duration * 1000, 3)])
+
+    def to_dict(self, duration: float) -> Dict[str, Any]:
+        totals: Dict[str, float] = {}
+        for kind, _, _, span_ms in self.spans:
+            totals[kind] = totals.get(kind, 0.0) + span_ms
+        return {
+            'ts': time.time(),
+            'update_id': self.update_id,
+            'event': self.event,
+            'user_id': self.user_id,
+            'handler': self.handler,
+            'duration_ms': round(duration * 1000, 3),
+            'totals_ms': {kind: round(ms, 3) for kind, ms in totals.items()},
+            'spans': self.spans,
+        }
+
+
+# Трасса текущего апдейта; None - апдейт не попал в выборку
+current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar('current_trace', default=None)
+
+
+def record_span(kind: str, name: str, started: float):
+    """Attach a span that began at perf_counter() == `started` to the current trace, if any."""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add_span(kind, name, started, time.perf_counter() - started)
+
+
+class SlowUpdateLog:
+    """Appends traces of slow sampled updates to a JSONL file."""
+
+    def __init__(self, path: str, threshold_ms: float = 500, sample_rate: float = 1.0):
+        self.path = path
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.written = 0
+        self._file = None
+        self._lock = threading.Lock()
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def write(self, trace: Trace, duration: float):
+        if duration < self.threshold:
+            return
+        line = json.dumps(trace.to_dict(duration), ensure_ascii=False)
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.path, 'a', encoding='utf-8')
+                self._file.write(line + '\n')
+                self._file.flush()
+                self.written += 1
+            except OSError as e:
+                logger.warning(f"Slow update trace write failed: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None